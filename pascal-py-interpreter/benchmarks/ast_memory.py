@@ -0,0 +1,55 @@
+"""Memory used by the AST of the sample programs, scaled up.
+
+Compares the default nodes, which keep a reference to their token, with
+the position-only nodes built by `Parser(..., keep_tokens=False)`.
+
+    $ python3 -m benchmarks.ast_memory --factor 2000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.corpus import load_programs, scale_program
+from core.lexer import Lexer
+from core.parser import Parser
+from core.profiling import count_nodes
+
+
+def measure(source: str, keep_tokens: bool):
+    """Parse `source` and return (node count, bytes retained by the AST)."""
+    gc.collect()
+    tracemalloc.start()
+    parser = Parser(Lexer(source, regex=True), keep_tokens=keep_tokens)
+    tree = parser.parse()
+    del parser
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count_nodes(tree), size
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument(
+        '--factor', type=int, default=1000,
+        help='How many times the main statements are repeated',
+    )
+    args = arg_parser.parse_args()
+
+    header = '{:<14} {:>9} {:>13} {:>13} {:>8}'.format(
+        'program', 'nodes', 'tokens (B)', 'positions (B)', 'saved'
+    )
+    print(header)
+    print('-' * len(header))
+    for name, source in load_programs().items():
+        source = scale_program(source, args.factor)
+        nodes, with_tokens = measure(source, keep_tokens=True)
+        _, positions_only = measure(source, keep_tokens=False)
+        print('{:<14} {:>9} {:>13} {:>13} {:>7.1%}'.format(
+            name, nodes, with_tokens, positions_only,
+            1 - positions_only / with_tokens,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import os
+import re
+
+from typing import Dict
+
+PROGRAMS_DIR = os.path.join(os.path.dirname(__file__), '..', 'programs')
+
+_MAIN_BEGIN = re.compile(r'\bbegin\b', re.IGNORECASE)
+_MAIN_END = re.compile(r'\bend\s*\.', re.IGNORECASE)
+
+
+def load_programs(prefix: str = 'valid') -> Dict[str, str]:
+    """Source code of the sample programs, keyed by file name."""
+    programs = {}
+    for name in sorted(os.listdir(PROGRAMS_DIR)):
+        if name.startswith(prefix) and name.endswith('.pas'):
+            with open(os.path.join(PROGRAMS_DIR, name)) as f:
+                programs[name] = f.read()
+    return programs
+
+
+def scale_program(source: str, factor: int) -> str:
+    """Repeat the statements of the main compound statement `factor` times.
+
+    The main compound statement is the last BEGIN ... END. of the program,
+    so declarations are kept as they are and the result is still valid.
+    """
+    begin = list(_MAIN_BEGIN.finditer(source))[-1].end()
+    end = list(_MAIN_END.finditer(source))[-1].start()
+    body = source[begin:end]
+    return source[:begin] + ';'.join([body] * factor) + source[end:]
@@ -0,0 +1,122 @@
+"""Synthetic Pascal programs of configurable size and shape.
+
+The programs are valid and run to completion: every variable is assigned
+before it is read and nothing is ever divided by zero.
+
+    $ python3 -m benchmarks.generator --vars 200 --depth 8 --calls 50
+"""
+import argparse
+import random
+
+from typing import List
+
+
+def expression(
+    rng: random.Random,
+    operands: List[str],
+    length: int,
+    divisors: List[str]
+) -> str:
+    """A chain of `length` operands joined by random operators.
+
+    Operands are variables, literals, negated operands and parenthesized
+    sums. Divisors are only taken from `divisors`, variables that hold a
+    positive integer, and literals, so none of them is ever zero.
+    """
+    def operand(names: List[str]) -> str:
+        roll = rng.random()
+        if roll < 0.1:
+            return f'-{rng.choice(names)}'
+        if roll < 0.2:
+            return f'({rng.choice(divisors)} + {rng.randint(1, 9)})'
+        if roll < 0.4:
+            return str(rng.randint(1, 9))
+        return rng.choice(names)
+
+    parts = [operand(operands)]
+    for _ in range(length - 1):
+        op = rng.choice(('+', '-', '*', 'div', '/'))
+        parts.append(op)
+        parts.append(operand(divisors if op in ('div', '/') else operands))
+    return ' '.join(parts)
+
+
+def generate_program(
+    var_decls: int = 20,
+    depth: int = 3,
+    expr_length: int = 5,
+    statements: int = 50,
+    calls: int = 10,
+    seed: int = 0,
+) -> str:
+    """Source of a program with the given shape.
+
+    var_decls   -- global INTEGER variables, each assigned once
+    depth       -- procedures nested in each other, each calling the next
+    expr_length -- operands of every expression
+    statements  -- assignments of an expression in the main block
+    calls       -- calls of the outermost procedure in the main block
+    """
+    rng = random.Random(seed)
+    names = [f'V{i}' for i in range(max(var_decls, 1))]
+    indent = '   '
+    lines = ['program Generated;', 'var']
+    for i in range(0, len(names), 8):
+        lines.append(f'{indent}{", ".join(names[i:i + 8])} : integer;')
+    lines.append(f'{indent}R : real;')
+    lines.append('')
+
+    # P1 contains P2, which contains P3 ... every procedure assigns its
+    # local from its parameter and the globals, then calls the next one
+    for level in range(1, depth + 1):
+        pad = indent * (level - 1)
+        lines.append(f'{pad}procedure P{level}(A{level} : integer);')
+        lines.append(f'{pad}var L{level} : integer;')
+    for level in range(depth, 0, -1):
+        pad = indent * (level - 1)
+        operands = names + [f'A{level}'] + [f'L{i}' for i in range(1, level)]
+        lines.append(f'{pad}begin')
+        lines.append(
+            f'{pad}{indent}L{level} := '
+            f'{expression(rng, operands, expr_length, names)};'
+        )
+        if level < depth:
+            lines.append(f'{pad}{indent}P{level + 1}(L{level} + 1)')
+        lines.append(f'{pad}end;')
+    lines.append('')
+
+    body = [f'{name} := {rng.randint(1, 9)}' for name in names]
+    body.extend(
+        f'R := {expression(rng, names, expr_length, names)}'
+        for _ in range(statements)
+    )
+    if depth:
+        body.extend(f'P1({rng.choice(names)})' for _ in range(calls))
+    lines.append('begin')
+    lines.append(';\n'.join(f'{indent}{statement}' for statement in body))
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--vars', type=int, default=20)
+    arg_parser.add_argument('--depth', type=int, default=3)
+    arg_parser.add_argument('--expr-length', type=int, default=5)
+    arg_parser.add_argument('--statements', type=int, default=50)
+    arg_parser.add_argument('--calls', type=int, default=10)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+
+    print(generate_program(
+        var_decls=args.vars,
+        depth=args.depth,
+        expr_length=args.expr_length,
+        statements=args.statements,
+        calls=args.calls,
+        seed=args.seed,
+    ), end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Import time of the interpreter, in fresh Python processes.
+
+Measures `import core`, the first `core.compile`, which imports the lexer,
+parser and semantic analyzer, and `import main`. Fails if `import core`
+loads a lexer, parser or visitor module, which must stay lazy (see
+core/api.py), or if it takes longer than `--budget` milliseconds.
+
+    $ python3 -m benchmarks.import_time --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# run in a child process, prints the times in seconds and the modules loaded
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import core
+imported = time.perf_counter()
+loaded = sorted(name for name in sys.modules if name.startswith('core'))
+core.compile('program P; var x : integer; begin x := 1 end.')
+compiled = time.perf_counter()
+import main
+done = time.perf_counter()
+print(json.dumps({
+    'import core': imported - start,
+    'first compile': compiled - imported,
+    'import main': done - compiled,
+    'loaded': loaded,
+}))
+'''
+
+# modules `import core` may load
+LEAN = {'core', 'core.api', 'core.tracing'}
+
+
+def probe() -> dict:
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--budget', type=float, default=50.0,
+                            help='Slowest `import core` allowed, in ms')
+    args = arg_parser.parse_args()
+
+    runs = [probe() for _ in range(args.repeat)]
+    print(f'best of {args.repeat} fresh processes')
+    for step in ('import core', 'first compile', 'import main'):
+        best = min(run[step] for run in runs)
+        print(f'{step:<14} {best * 1e3:>8.1f} ms')
+
+    failed = False
+    heavy = sorted(set(runs[0]['loaded']) - LEAN)
+    if heavy:
+        print(f'`import core` loads: {", ".join(heavy)}')
+        failed = True
+    if min(run['import core'] for run in runs) * 1e3 > args.budget:
+        print(f'`import core` is over the budget of {args.budget:.0f} ms')
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Time and memory of every phase of the interpreter on generated programs.
+
+Programs of several shapes are made with benchmarks.generator, then
+lexed (`Lexer.tokenize`), parsed, analyzed, interpreted and visualized.
+Each phase reports its best time over `--repeat` runs, its throughput in
+tokens or AST nodes per second, and the peak memory it allocates, measured
+in a separate run under tracemalloc. A phase is repeated for at least
+`--min-time` seconds, so the best time of a short one is not a single noisy
+run. Results can be saved as JSON and compared with a previous run to spot
+regressions.
+
+    $ python3 -m benchmarks.phases --output before.json
+    $ python3 -m benchmarks.phases --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from typing import Any, Dict
+
+from benchmarks.generator import generate_program
+from core import tracing
+from core.lexer import Lexer
+from core.parser import Parser
+from core.profiling import count_nodes
+from core.visitors.ast import ASTVisualizer
+from core.visitors.pascal import Interpreter
+from core.visitors.semantic import SemanticAnalyzer
+
+# generate_program arguments of every shape, at --scale 1
+SHAPES = {
+    'declarations': dict(var_decls=2000, depth=1, statements=50, calls=1),
+    'nesting': dict(var_decls=10, depth=60, statements=10, calls=20),
+    'expressions': dict(var_decls=20, expr_length=200, statements=100),
+    'calls': dict(var_decls=10, depth=3, statements=10, calls=2000),
+}
+
+# Every phase takes the results of the previous ones, by phase name
+
+
+def lex(state: Dict[str, Any]):
+    return Lexer(state['source']).tokenize()
+
+
+def parse(state: Dict[str, Any]):
+    return Parser(state['lexer']).parse()
+
+
+def analyze(state: Dict[str, Any]):
+    SemanticAnalyzer().visit(state['parser'])
+
+
+def interpret(state: Dict[str, Any]):
+    Interpreter(state['parser']).interpret()
+
+
+def visualize(state: Dict[str, Any]):
+    return ASTVisualizer(state['parser']).gendot()
+
+
+# phase -> (function, unit of its throughput)
+PHASES = {
+    'lexer': (lex, 'tokens'),
+    'parser': (parse, 'nodes'),
+    'semantic': (analyze, 'nodes'),
+    'interpreter': (interpret, 'nodes'),
+    'visualizer': (visualize, 'nodes'),
+}
+
+
+def scaled(shape: dict, scale: float) -> dict:
+    return {
+        name: max(1, round(value * scale)) if name != 'depth' else value
+        for name, value in shape.items()
+    }
+
+
+def run_phases(source: str, repeat: int, min_time: float) -> dict:
+    state: Dict[str, Any] = {'source': source}
+    phases = {}
+    for name, (phase, unit) in PHASES.items():
+        best = float('inf')
+        runs = 0
+        total = 0.0
+        while runs < repeat or total < min_time:
+            start = time.perf_counter()
+            result = phase(state)
+            seconds = time.perf_counter() - start
+            best = min(best, seconds)
+            total += seconds
+            runs += 1
+
+        tracemalloc.start()
+        phase(state)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        state[name] = result
+        if name == 'lexer':
+            state['tokens'] = len(result)
+        elif name == 'parser':
+            state['nodes'] = count_nodes(result)
+        phases[name] = {
+            'seconds': best,
+            'runs': runs,
+            'unit': unit,
+            'per_second': state[unit] / best,
+            'peak_bytes': peak,
+        }
+    return {
+        'source_bytes': len(source.encode()),
+        'tokens': state['tokens'],
+        'nodes': state['nodes'],
+        'phases': phases,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> int:
+    """Print the time ratios against `baseline`, return the regressions."""
+    regressions = 0
+    print(f'\ncompared with the baseline (regression above +{threshold:.0%})')
+    for shape, result in results.items():
+        for name, phase in result['phases'].items():
+            before = baseline.get(shape, {}).get('phases', {}).get(name)
+            if before is None:
+                continue
+            ratio = phase['seconds'] / before['seconds']
+            mark = ''
+            if ratio > 1 + threshold:
+                mark = '  REGRESSION'
+                regressions += 1
+            print(f'{shape:<13} {name:<12} {ratio:>8.2f}x{mark}')
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiplies the size of every shape')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--min-time', type=float, default=0.5,
+                            help='Repeat every phase for at least as long')
+    arg_parser.add_argument('--shape', action='append', choices=SHAPES,
+                            help='Only run these shapes (default: all)')
+    arg_parser.add_argument('--output', help='Save the results as JSON')
+    arg_parser.add_argument('--compare', metavar='JSON',
+                            help='Results of a previous run to compare with')
+    arg_parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Slowdown reported as a regression')
+    args = arg_parser.parse_args()
+
+    # long expression chains and deep nesting are visited recursively
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    tracing.configure()
+
+    results = {}
+    header = '{:<13} {:<12} {:>10} {:>16} {:>12}'.format(
+        'shape', 'phase', 'time (s)', 'throughput', 'peak (KiB)'
+    )
+    print(header)
+    print('-' * len(header))
+    for shape in args.shape or SHAPES:
+        source = generate_program(**scaled(SHAPES[shape], args.scale))
+        result = results[shape] = run_phases(
+            source, args.repeat, args.min_time
+        )
+        for name, phase in result['phases'].items():
+            print('{:<13} {:<12} {:>10.4f} {:>9,.0f} {:<6} {:>12,.0f}'.format(
+                shape, name, phase['seconds'], phase['per_second'],
+                f'{phase["unit"]}/s', phase['peak_bytes'] / 1024,
+            ))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'scale': args.scale,
+                'repeat': args.repeat,
+                'min_time': args.min_time,
+                'results': results,
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
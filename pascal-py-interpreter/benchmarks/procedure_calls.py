@@ -0,0 +1,96 @@
+"""Cost of a procedure call with the stack trace disabled and enabled.
+
+Runs a program made of `--calls` calls of a small procedure on every
+execution engine, first with tracing off, then with the stack trace on
+and printed to os.devnull, and reports the time per call. The engines
+are created, and the program compiled, before timing.
+
+    $ python3 -m benchmarks.procedure_calls --calls 2000 --repeat 5
+"""
+import argparse
+import contextlib
+import os
+import time
+
+from core import tracing
+from core.lexer import Lexer
+from core.parser import Parser
+from core.visitors.closure import ClosureInterpreter
+from core.visitors.pascal import Interpreter
+from core.visitors.semantic import SemanticAnalyzer
+from core.vm import Compiler, VirtualMachine
+
+PROGRAM = '''
+program Calls;
+var x : integer;
+
+procedure Alpha(a : integer; b : integer);
+var y : integer;
+begin
+   y := a * b + 1
+end;
+
+begin
+   x := 2;
+   {calls}
+end.
+'''
+
+
+def build_program(calls: int) -> str:
+    return PROGRAM.replace('{calls}', ';\n   '.join(['Alpha(x, 3)'] * calls))
+
+
+def closure_engine(tree):
+    interpreter = ClosureInterpreter(tree)
+    # the first run compiles the closures
+    with open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            interpreter.interpret()
+    return interpreter.interpret
+
+
+# the engines pick their tracer when they are created
+ENGINES = {
+    'tree': lambda tree: Interpreter(tree).interpret,
+    'closure': closure_engine,
+    'vm': lambda tree: VirtualMachine(Compiler().compile(tree)).run,
+}
+
+
+def best_time(run, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tree = Parser(Lexer(build_program(args.calls))).parse()
+    SemanticAnalyzer().visit(tree)
+
+    print(f'{args.calls} calls, best of {args.repeat}, time per call')
+    print(f'{"engine":<8} {"trace off":>12} {"trace on":>12}')
+    for name, engine in ENGINES.items():
+        tracing.configure(stack=False)
+        off = best_time(engine(tree), args.repeat)
+        tracing.configure(stack=True)
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                on = best_time(engine(tree), args.repeat)
+        tracing.configure(stack=False)
+        print(
+            f'{name:<8} {off / args.calls * 1e6:>10.2f}us '
+            f'{on / args.calls * 1e6:>10.2f}us'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Time of the Source2Source rewrite as the program grows.
+
+Generates programs of `--statements` assignments, doubled `--steps` times,
+analyzes them, then times their rewrite into a string and streamed to a
+file, and reports the time per KiB of output. The rewrite is linear if that
+time stays flat: fails if the largest program costs more than `--threshold`
+times as much per KiB as the smallest one.
+
+    $ python3 -m benchmarks.source_to_source --statements 5000 --steps 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import generate_program
+from core.lexer import Lexer
+from core.parser import Parser
+from core.visitors.semantic import SemanticAnalyzer
+from core.visitors.source_to_source import Source2Source
+
+
+def best_time(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--statements', type=int, default=2500)
+    arg_parser.add_argument('--steps', type=int, default=5)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--threshold', type=float, default=2.0)
+    args = arg_parser.parse_args()
+
+    row = '{:>10} {:>12} {:>14} {:>14}'
+    header = row.format(
+        'statements', 'output (KiB)', 'string (us/KiB)', 'file (us/KiB)'
+    )
+    print(header)
+    print('-' * len(header))
+
+    costs = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'output.pas')
+        for step in range(args.steps):
+            statements = args.statements * 2 ** step
+            # procedures are left out: their calls are not rewritten
+            source = generate_program(
+                var_decls=50, depth=0, statements=statements
+            )
+            tree = Parser(Lexer(source)).parse()
+            SemanticAnalyzer().visit(tree)
+
+            kib = len(Source2Source().translate(tree)) / 1024
+
+            def to_file():
+                with open(path, 'w') as f:
+                    Source2Source(f).translate(tree)
+
+            in_memory = best_time(
+                lambda: Source2Source().translate(tree), args.repeat
+            )
+            streamed = best_time(to_file, args.repeat)
+            costs.append(in_memory / kib)
+            print(row.format(
+                statements, f'{kib:,.0f}',
+                f'{in_memory / kib * 1e6:.1f}', f'{streamed / kib * 1e6:.1f}',
+            ))
+
+    growth = costs[-1] / costs[0]
+    print(f'cost per KiB, largest over smallest program: {growth:.2f}x')
+    if growth > args.threshold:
+        print(f'the rewrite is not linear (threshold {args.threshold:.1f}x)')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Visits per second through NodeVisitor.visit on a deep expression tree.
+
+Compares the dispatch table of NodeVisitor with the previous dispatch,
+which built the `visit_<NodeName>` name and looked it up with getattr on
+every visit.
+
+    $ python3 -m benchmarks.visit_dispatch --depth 500 --repeat 200
+"""
+import argparse
+import sys
+import time
+
+from typing import Union
+
+from core.ast import BinOp, Num, UnaryOp
+from core.token import Token, TokenType
+from core.visitors.node_visitor import NodeVisitor
+
+
+def build_tree(depth: int) -> Union[BinOp, Num]:
+    """A left-deep `((1 + -2) * 3 + -4) ...` tree with `depth` operators."""
+    ops = (TokenType.PLUS, TokenType.MUL, TokenType.MINUS)
+    node: Union[BinOp, Num] = Num(Token(TokenType.INTEGER_CONST, 1))
+    for i in range(depth):
+        op = ops[i % len(ops)]
+        right: Union[UnaryOp, Num] = Num(Token(TokenType.INTEGER_CONST, i))
+        if i % 2:
+            right = UnaryOp(Token(TokenType.MINUS, '-'), right)
+        node = BinOp(node, right, Token(op, op.value))
+    return node
+
+
+class NodeCounter(NodeVisitor):
+    def visit_BinOp(self, node):
+        return 1 + self.visit(node.left) + self.visit(node.right)
+
+    def visit_UnaryOp(self, node):
+        return 1 + self.visit(node.expr)
+
+    def visit_Num(self, node):
+        return 1
+
+
+class GetattrNodeCounter(NodeCounter):
+    def visit(self, node):
+        method_name = f'visit_{type(node).__name__}'
+        visitor = getattr(self, method_name, self.undefined_visit)
+        return visitor(node)
+
+
+def visits_per_second(visitor: NodeVisitor, tree, repeat: int) -> float:
+    visits = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        visits += visitor.visit(tree)
+    return visits / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--depth', type=int, default=500)
+    arg_parser.add_argument('--repeat', type=int, default=200)
+    args = arg_parser.parse_args()
+
+    # every operator adds two frames: visit and visit_BinOp
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * args.depth + 100))
+    tree = build_tree(args.depth)
+
+    before = visits_per_second(GetattrNodeCounter(), tree, args.repeat)
+    after = visits_per_second(NodeCounter(), tree, args.repeat)
+    print(f'getattr dispatch : {before:>12,.0f} visits/s')
+    print(f'dispatch table   : {after:>12,.0f} visits/s')
+    print(f'speedup          : {after / before:>12.2f}x')
+
+
+if __name__ == '__main__':
+    main()
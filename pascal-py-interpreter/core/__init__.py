@@ -0,0 +1,3 @@
+from core.api import ENGINES, compile, run
+
+__all__ = ['ENGINES', 'compile', 'run']
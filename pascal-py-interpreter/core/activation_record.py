@@ -6,20 +6,58 @@ class ARType(Enum):
 
 
 class ActivationRecord:
-    def __init__(self, name, type, nesting_level):
+    """Frame of a program or procedure invocation.
+
+    Members are kept in a dict keyed by name, unless `slot_names` is given:
+    then they live in the fixed-size `locals` list, at the slots the
+    SemanticAnalyzer assigned (see `Var.depth` and `Var.slot`).
+    `static_link` is the record of the lexically enclosing scope.
+    """
+    def __init__(
+        self, name, type, nesting_level, slot_names=None, static_link=None
+    ):
         self.name = name
         self.type = type
         self.nesting_level = nesting_level
-        self.members = {}
+        self.static_link = static_link
+        self.slot_names = slot_names
+        if slot_names is None:
+            self.members = {}
+        else:
+            self.locals = [None] * len(slot_names)
+
+    def enclosing(self, depth):
+        """Return the record `depth` static links up from this one."""
+        ar = self
+        for _ in range(depth):
+            ar = ar.static_link
+        return ar
 
     def __setitem__(self, key, value):
-        self.members[key] = value
+        if self.slot_names is None:
+            self.members[key] = value
+        else:
+            self.locals[self.slot_names.index(key)] = value
 
     def __getitem__(self, key):
-        return self.members[key]
+        if self.slot_names is None:
+            return self.members[key]
+        return self.locals[self.slot_names.index(key)]
 
     def get(self, key):
-        return self.members.get(key)
+        if self.slot_names is None:
+            return self.members.get(key)
+        if key in self.slot_names:
+            return self.locals[self.slot_names.index(key)]
+        return None
+
+    def items(self):
+        if self.slot_names is None:
+            return self.members.items()
+        return [
+            (name, val) for name, val in zip(self.slot_names, self.locals)
+            if val is not None
+        ]
 
     def __str__(self):
         lines = [
@@ -29,10 +67,10 @@ class ActivationRecord:
                 name=self.name,
             )
         ]
-        for name, val in self.members.items():
+        for name, val in self.items():
             lines.append(f'   {name:<20}: {val}')
 
         s = '\n'.join(lines)
         return s
 
-    __repr__ = __str__
\ No newline at end of file
+    __repr__ = __str__
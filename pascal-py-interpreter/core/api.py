@@ -0,0 +1,110 @@
+###############################################################################
+#                                                                             #
+#  EMBEDDING API                                                              #
+#                                                                             #
+###############################################################################
+#
+# Compile and run programs from Python, without main.py:
+#
+#     >>> import core
+#     >>> tree = core.compile(open('programs/valid_00.pas').read())
+#     >>> core.run(tree, engine='vm')
+#     {'A': 2, 'B': 25, 'Y': 5.997142857142857}
+#
+# Importing this module, or `core`, loads no lexer, parser or visitor: each
+# one is imported by the first call that needs it, so services embedding the
+# interpreter start fast and only pay for the engines they use. Keep it so;
+# `python3 -m benchmarks.import_time` checks it.
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+from core import tracing
+
+if TYPE_CHECKING:
+    from core.ast import Program
+    from core.lexer import Source
+
+ENGINES = ('tree', 'closure', 'vm', 'py')
+
+
+def compile(
+    source: 'Source',
+    *,
+    optimize: bool = False,
+    scope: bool = False
+) -> 'Program':
+    """Lex, parse and analyze a program, and return its AST.
+
+    `source` is the program's text, a text or binary file, or an mmap.
+    With `optimize`, constant expressions are folded, as with `-O`, and
+    with `scope` the scope trace is printed while analyzing. Raises the
+    first LexerError, ParserError or SemanticError of the program.
+    """
+    from core.lexer import Lexer
+    from core.parser import Parser
+    from core.visitors.semantic import SemanticAnalyzer
+
+    with tracing.configured(scope=scope):
+        tree = Parser(Lexer(source)).parse()
+        SemanticAnalyzer().visit(tree)
+    if optimize:
+        from core.visitors.optimizer import ConstantFolder
+        tree = ConstantFolder().optimize(tree)
+    return tree
+
+
+def check_engine(engine: str) -> None:
+    if engine not in ENGINES:
+        raise ValueError(f'Unknown engine {engine!r}, not one of {ENGINES}')
+
+
+def execute(
+    tree: 'Program',
+    engine: str = 'tree',
+    trace: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Run an analyzed program on one of the ENGINES.
+
+    Returns the global variables the program ends with, by name; the ones
+    never assigned are left out. The stack trace is printed with `trace`,
+    or when the stack channel is configured if it is None.
+    """
+    check_engine(engine)
+    if engine == 'tree':
+        from core.visitors.pascal import Interpreter
+        return Interpreter(tree, trace).interpret()
+    elif engine == 'closure':
+        from core.visitors.closure import ClosureInterpreter
+        return ClosureInterpreter(tree, trace).interpret()
+    elif engine == 'vm':
+        from core.vm import Compiler, VirtualMachine
+        return VirtualMachine(Compiler().compile(tree), trace).run()
+    else:
+        from core.visitors.python_codegen import PythonInterpreter
+        return PythonInterpreter(tree, trace).interpret()
+
+
+def run(
+    program: Union['Source', 'Program'],
+    *,
+    engine: str = 'tree',
+    trace: bool = False,
+    optimize: bool = False
+) -> Dict[str, Any]:
+    """Run a program, given as source or as a tree returned by `compile`.
+
+    A compiled tree can be run any number of times, on any engine. With
+    `trace`, the call stack is printed as with `--stack`; the traces of
+    the other callers of the interpreter are left as they are. Returns the
+    global variables of the program, as `execute`.
+    """
+    from core.ast import Program
+
+    check_engine(engine)
+
+    if not isinstance(program, Program):
+        program = compile(program, optimize=optimize)
+    elif optimize:
+        from core.visitors.optimizer import ConstantFolder
+        program = ConstantFolder().optimize(program)
+
+    return execute(program, engine, trace)
@@ -3,96 +3,182 @@
 #  ABSTRACT SYNTAX TREE OBJECTS                                               #
 #                                                                             #
 ###############################################################################
-from typing import Union, List
-from core.token import Token
+#
+# Nodes declare __slots__ to keep large trees small. Nodes built out of a
+# token keep a reference to it by default; with keep_token=False they only
+# store the token type and its (lineno, column) position, and `token`
+# rebuilds an equivalent Token on demand.
+from typing import TYPE_CHECKING, Union, List, Optional, Tuple, cast
+from core.token import Token, TokenValue
 
-class AST(object):
-    pass
+if TYPE_CHECKING:
+    from core.symbol import ProcedureSymbol
 
-class Num(AST):
-    def __init__(self, token: Token):
-        self.token = token
+class AST(object):
+    __slots__ = ()
+
+class TokenNode(AST):
+    """Base class of the nodes constructed out of a single token."""
+    __slots__ = ('_token', 'token_type', 'lineno', 'column')
+
+    def __init__(self, token: Token, keep_token: bool = True) -> None:
+        self._token: Optional[Token] = token if keep_token else None
+        self.token_type = token.type
+        self.lineno = token.lineno
+        self.column = token.column
+
+    def _token_value(self) -> TokenValue:
+        return self.token_type.value
+
+    @property
+    def token(self) -> Token:
+        if self._token is not None:
+            return self._token
+        return Token(
+            self.token_type, self._token_value(),
+            lineno=self.lineno, column=self.column
+        )
+
+class Num(TokenNode):
+    __slots__ = ('value',)
+
+    def __init__(self, token: Token, keep_token: bool = True):
+        super().__init__(token, keep_token)
         self.value = token.value
 
-class Var(AST):
+    def _token_value(self) -> TokenValue:
+        return self.value
+
+class Var(TokenNode):
     """The Var node is constructed out of ID token."""
-    def __init__(self, token: Token) -> None:
-        # The self.value holds the variable s name.
-        self.token = token
-        self.value = token.value
+    __slots__ = ('value', 'depth', 'slot')
+
+    def __init__(self, token: Token, keep_token: bool = True) -> None:
+        super().__init__(token, keep_token)
+        # The self.value holds the variable s name; the parser only builds
+        # a Var out of an ID token
+        self.value = cast(str, token.value)
+        # set by the SemanticAnalyzer: how many scopes up the variable is
+        # declared and its slot in that scope's activation record
+        self.depth: Optional[int] = None
+        self.slot: Optional[int] = None
+
+    def _token_value(self) -> TokenValue:
+        return self.value
+
+class UnaryOp(TokenNode):
+    __slots__ = ('expr',)
 
-class UnaryOp(AST):
     def __init__(
         self,
         op: Token,
-        expr: Union['UnaryOp', Num, Var, 'BinOp']
+        expr: Union['UnaryOp', Num, Var, 'BinOp'],
+        keep_token: bool = True
     ) -> None:
         # represents our unary operator
-        self.token = self.op = op
+        super().__init__(op, keep_token)
         # represents another AST Token
         self.expr = expr
 
-class BinOp(AST):
+    @property
+    def op(self) -> Token:
+        return self.token
+
+class BinOp(TokenNode):
+    __slots__ = ('left', 'right')
+
     def __init__(
         self,
         left: Union[UnaryOp, Num, Var, 'BinOp'],
         right: Union[UnaryOp, Num, Var, 'BinOp'],
-        op: Token
+        op: Token,
+        keep_token: bool = True
     ) -> None:
+        super().__init__(op, keep_token)
         self.left = left
-        self.token = self.op = op
         self.right = right
 
-class Assign(AST):
+    @property
+    def op(self) -> Token:
+        return self.token
+
+class Assign(TokenNode):
+    __slots__ = ('left', 'right')
+
     def __init__(
         self,
         left: Var,
         op: Token,
-        right: Union[UnaryOp, Num, Var, BinOp]
+        right: Union[UnaryOp, Num, Var, BinOp],
+        keep_token: bool = True
     ) -> None:
+        super().__init__(op, keep_token)
         self.left = left
-        self.token = self.op = op
         self.right = right
 
-class Type(AST):
-    def __init__(self, token: Token) -> None:
-        self.token = token
-        self.value = token.value
+    @property
+    def op(self) -> Token:
+        return self.token
+
+class Type(TokenNode):
+    __slots__ = ('value',)
+
+    def __init__(self, token: Token, keep_token: bool = True) -> None:
+        super().__init__(token, keep_token)
+        # the name of the type, e.g. INTEGER, out of its keyword token
+        self.value = cast(str, token.value)
+
+    def _token_value(self) -> TokenValue:
+        return self.value
 
 class VarDecl(AST):
+    __slots__ = ('var_node', 'type_node')
+
     def __init__(self, var_node: Var, type_node: Type) -> None:
         self.var_node = var_node
         self.type_node = type_node
 
 class NoOp(AST):
     """Represent an empty statement"""
-    pass
+    __slots__ = ()
 
 class Param(AST):
+    __slots__ = ('var_node', 'type_node')
+
     def __init__(self, var_node: Var, type_node: Type) -> None:
         self.var_node = var_node
         self.type_node = type_node
 
-class ProcedureCall(AST):
+class ProcedureCall(TokenNode):
+    __slots__ = ('proc_name', 'actual_params', 'proc_symbol')
+
     def __init__(
         self,
         proc_name: str,
         actual_params: List[Union[UnaryOp, Num, Var, BinOp]],
-        token: Token
+        token: Token,
+        keep_token: bool = True
     ) -> None:
+        super().__init__(token, keep_token)
         self.proc_name = proc_name
         self.actual_params = actual_params  # a list of AST nodes
-        self.token = token
         # a reference to procedure declaration symbol
-        self.proc_symbol = None
+        self.proc_symbol: Optional['ProcedureSymbol'] = None
+
+    def _token_value(self) -> TokenValue:
+        return self.proc_name
 
 class Compound(AST):
     """Represents a 'BEGIN ... END' block"""
+    __slots__ = ('children',)
+
     def __init__(self) -> None:
         self.children: List[Union[NoOp, Compound, ProcedureCall, Assign]]
         self.children = []
 
 class ProcedureDecl(AST):
+    __slots__ = ('proc_name', 'params', 'block_node')
+
     def __init__(
         self,
         proc_name: str,
@@ -104,6 +190,8 @@ class ProcedureDecl(AST):
         self.block_node = block_node
 
 class FunctionDecl(AST):
+    __slots__ = ('fn_name', 'params', 'block_node', 'return_type')
+
     def __init__(
         self,
         fn_name: str,
@@ -117,6 +205,8 @@ class FunctionDecl(AST):
         self.return_type = return_type
 
 class Block(AST):
+    __slots__ = ('declarations', 'compound_statement', 'slot_names')
+
     def __init__(
         self,
         declarations: List[Union[VarDecl, ProcedureDecl, FunctionDecl]],
@@ -124,8 +214,12 @@ class Block(AST):
     ) -> None:
         self.declarations = declarations
         self.compound_statement = compound_statement
+        # names of the block's variables by slot, set by the SemanticAnalyzer
+        self.slot_names: Optional[Tuple[str, ...]] = None
 
 class Program(AST):
+    __slots__ = ('name', 'block')
+
     def __init__(self, name: str, block: Block) -> None:
         self.name = name
         self.block = block
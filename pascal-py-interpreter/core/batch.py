@@ -0,0 +1,173 @@
+###############################################################################
+#                                                                             #
+#  BATCH                                                                      #
+#                                                                             #
+###############################################################################
+#
+# Run many programs at once, with `main.py --batch`. Files are given as paths,
+# glob patterns or a manifest listing them, and are shared out to a pool of
+# worker processes. Each worker is started once and imports the interpreter
+# once, then lexes, parses, analyzes and runs the programs it is handed. Every
+# program gets a result: its status, its errors and the time of each phase,
+# printed as one JSON object per line (NDJSON). Traces are off in the
+# workers, and the analyzed program cache is not used.
+import glob
+import json
+import os
+import time
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from core import tracing
+from core.errors.generic import Error
+from core.errors.lexer import LexerError
+from core.errors.parser import ParserError
+from core.errors.semantic import SemanticError
+from core.api import execute
+from core.lexer import Lexer
+from core.parser import Parser
+from core.visitors.optimizer import ConstantFolder
+from core.visitors.semantic import SemanticAnalyzer
+
+OK = 'ok'
+READ_ERROR = 'read_error'
+LEXER_ERROR = 'lexer_error'
+PARSER_ERROR = 'parser_error'
+SEMANTIC_ERROR = 'semantic_error'
+RUNTIME_ERROR = 'runtime_error'
+
+_STATUSES = {
+    LexerError: LEXER_ERROR,
+    ParserError: PARSER_ERROR,
+    SemanticError: SEMANTIC_ERROR,
+}
+
+
+def expand(
+    patterns: Iterable[str],
+    manifest: Optional[str] = None
+) -> List[str]:
+    """Paths of the programs named by `patterns` and the manifest file.
+
+    A pattern is a path or a glob, `**` included. The manifest lists one
+    path or pattern per line; blank lines and lines starting with `#` are
+    skipped. Every path is only kept once, in the order it was named.
+    """
+    patterns = list(patterns)
+    if manifest is not None:
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    patterns.append(line)
+
+    paths: Dict[str, None] = {}
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                paths.setdefault(path)
+        else:
+            paths.setdefault(pattern)
+    return list(paths)
+
+
+def run_file(
+    path: str,
+    engine: str = 'tree',
+    optimize: bool = False,
+    all_errors: bool = False,
+) -> Dict[str, Any]:
+    """Lex, parse, analyze and run one program, and describe how it went.
+
+    Never raises: a program that cannot be read, or that fails at run
+    time, gets a result with an error status like any other. Errors are
+    described by `Error.as_dict`.
+    """
+    times: Dict[str, float] = {}
+    result: Dict[str, Any] = {
+        'path': path, 'status': OK, 'errors': [], 'times': times,
+    }
+    start = phase_start = time.perf_counter()
+
+    def lap(phase: str) -> None:
+        nonlocal phase_start
+        now = time.perf_counter()
+        times[phase] = now - phase_start
+        phase_start = now
+
+    try:
+        with open(path, 'rb') as f:
+            parser = Parser(Lexer(f), recover=all_errors)
+            tree = parser.parse()
+        lap('parse')
+        errors: List[Error] = list(parser.errors)
+        if not errors:
+            errors.extend(SemanticAnalyzer(recover=all_errors).analyze(tree))
+            lap('semantic')
+        if errors:
+            result['status'] = _STATUSES[type(errors[0])]
+            result['errors'] = [error.as_dict() for error in errors]
+        else:
+            if optimize:
+                tree = ConstantFolder().optimize(tree)
+                lap('optimize')
+            execute(tree, engine)
+            lap('run')
+    except (LexerError, ParserError, SemanticError) as error:
+        result['status'] = _STATUSES[type(error)]
+        result['errors'] = [error.as_dict()]
+    except Exception as error:
+        # an unreadable file, or a program failing at run time
+        is_read = isinstance(error, OSError) and 'parse' not in times
+        result['status'] = READ_ERROR if is_read else RUNTIME_ERROR
+        result['errors'] = [{
+            'error': type(error).__name__,
+            'code': None,
+            'message': f'{type(error).__name__}: {error}',
+            'line': None,
+            'column': None,
+        }]
+    times['total'] = time.perf_counter() - start
+    return result
+
+
+def _run_file(job: tuple) -> Dict[str, Any]:
+    path, options = job
+    return run_file(path, **options)
+
+
+def _init_worker() -> None:
+    # the workers are forked from main.py, whose traces may be enabled
+    tracing.configure()
+
+
+def run_batch(
+    paths: List[str],
+    jobs: Optional[int] = None,
+    **options: Any
+) -> Iterator[Dict[str, Any]]:
+    """Results of `run_file` on every path, in order, as they are ready.
+
+    The programs are run by `jobs` worker processes, all the CPUs by
+    default, and sent to them in chunks so small programs are not
+    dominated by the cost of the messages. A single job runs the programs
+    in this process.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        _init_worker()
+        for path in paths:
+            yield run_file(path, **options)
+        return
+
+    # multiprocessing is slow to import, and only needed here
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+    with ProcessPoolExecutor(jobs, initializer=_init_worker) as executor:
+        work = ((path, options) for path in paths)
+        yield from executor.map(_run_file, work, chunksize=chunksize)
+
+
+def to_ndjson(result: Dict[str, Any]) -> str:
+    return json.dumps(result, separators=(',', ':'))
@@ -0,0 +1,96 @@
+###############################################################################
+#                                                                             #
+#  CACHE OF ANALYZED PROGRAMS                                                 #
+#                                                                             #
+###############################################################################
+#
+# Like __pycache__, a `__pascalcache__` directory next to a program keeps its
+# pickled AST, as left by the SemanticAnalyzer (Var slots, procedure symbols).
+# Entries are keyed by a hash of the source and of the interpreter
+# itself: the Python version and the source of the `core` package, so any
+# change to either misses the cache instead of loading a stale tree.
+import glob
+import hashlib
+import os
+import pickle
+import sys
+
+from typing import IO, Optional, Union
+
+from core.ast import Program
+from core.lexer import CHUNK_SIZE
+
+CACHE_DIR = '__pascalcache__'
+
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_interpreter_version: Optional[bytes] = None
+
+
+def interpreter_version() -> bytes:
+    """Digest of the Python version and of every module of `core`."""
+    global _interpreter_version
+    if _interpreter_version is None:
+        digest = hashlib.sha256(sys.version.encode())
+        pattern = os.path.join(_CORE_DIR, '**', '*.py')
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            digest.update(os.path.relpath(path, _CORE_DIR).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _interpreter_version = digest.digest()
+    return _interpreter_version
+
+
+def _entry_path(program_path: str, key: str) -> str:
+    directory, filename = os.path.split(program_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, CACHE_DIR, f'{stem}.{key}.pickle')
+
+
+def digest_source(source: Union[str, IO[bytes]]) -> str:
+    """Hash of a program's source, given as text or as a binary file."""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        digest.update(source.encode())
+    else:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(program_path: str, source_digest: str) -> str:
+    """Path of the cache entry of a program, given its source digest."""
+    digest = hashlib.sha256(interpreter_version())
+    digest.update(source_digest.encode())
+    return _entry_path(program_path, digest.hexdigest()[:16])
+
+
+def load(program_path: str, source_digest: str) -> Optional[Program]:
+    """Return the cached tree of the program, None if there is none."""
+    try:
+        with open(cache_path(program_path, source_digest), 'rb') as f:
+            tree = pickle.load(f)
+    except Exception:
+        # a missing, truncated or unreadable entry is only a cache miss
+        return None
+    return tree if isinstance(tree, Program) else None
+
+
+def store(program_path: str, source_digest: str, tree: Program) -> None:
+    """Cache the tree of the program, replacing its stale entries."""
+    path = cache_path(program_path, source_digest)
+    entries = _entry_path(glob.escape(program_path), '[0-9a-f]' * 16)
+    try:
+        data = pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for stale in glob.glob(entries):
+            if stale != path:
+                os.remove(stale)
+        # written aside and renamed, so readers never see a partial entry
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except (OSError, pickle.PicklingError, RecursionError):
+        # caching is best effort: the program runs all the same
+        pass
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import Any, Dict, Optional
 from core.token import Token
 
 class ErrorCode(Enum):
@@ -23,6 +23,17 @@ class Error(Exception):
         self.message = f'{self.__class__.__name__}: {message}'
         super().__init__(self.message)
 
+    def as_dict(self) -> Dict[str, Any]:
+        """The error as plain data: its kind, code, message and position."""
+        token = self.token
+        return {
+            'error': self.__class__.__name__,
+            'code': self.error_code.name if self.error_code else None,
+            'message': self.message,
+            'line': token.lineno if token else None,
+            'column': token.column if token else None,
+        }
+
 class LexerError(Error):
     pass
 
@@ -1,22 +1,96 @@
-from core.token import TokenType, Token, RESERVED_KEYWORDS
+from core.token import (
+    TokenType, Token, TokenArray, TokenValue, RESERVED_KEYWORDS,
+    offset_to_position
+)
 from core.errors.lexer import LexerError
 
-from typing import Union, Optional
+import codecs
+import mmap
+import re
+from array import array
+from bisect import bisect_left
+from typing import IO, Union, Optional, Iterator, List, Tuple
+
+# Input of the lexer: the whole text, or a file object (text or binary,
+# read as UTF-8) or an mmap, which is scanned in chunks
+Source = Union[str, IO[str], IO[bytes], mmap.mmap]
+
+# Number of characters (or bytes) read at a time from a streamed input
+CHUNK_SIZE = 1 << 16
+
+# Master pattern used by the regex scanning mode. The alternatives mirror
+# the branches of `get_next_token`, in the same order of precedence. One
+# of them always matches after the skipped prefix, so it never backtracks.
+_TOKEN_RE = re.compile(r"""
+    (?:\s+|\{[^}]*\})*          # whitespace and {...} comments
+    (?:
+        (?P<NUMBER>\d+(?:\.\d*)?)  # INTEGER_CONST or REAL_CONST
+      | (?P<ID>[^\W\d_][^\W_]*)    # identifiers and reserved keywords
+      | (?P<ASSIGN>:=)
+      | (?P<CHAR>.)               # any other single-character token
+      | (?P<EOF>\Z)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+# Single-character token types, e.g. {';': TokenType.SEMI}
+_SINGLE_CHAR_TOKENS = {
+    token_type.value: token_type
+    for token_type in TokenType
+    if len(token_type.value) == 1
+}
 
 class Lexer(object):
 
-    def __init__(self, text: str) -> None:
-        # client string input, e.g. "4 + 2 * 3 - 6 / 2"
-        self.text = text
-        # self.pos is an index into self.text
+    def __init__(
+        self,
+        source: Source,
+        regex: bool = False,
+        chunk_size: int = CHUNK_SIZE
+    ) -> None:
+        # client string input, e.g. "4 + 2 * 3 - 6 / 2"; empty when the
+        # input is streamed from a file object or an mmap
+        self.text = ''
+        self._source: Optional[Source] = None
+        if isinstance(source, str):
+            self.text = source
+        else:
+            self._source = source
+        self._streamed = self._source is not None
+        # self.pos is an index into the input
         self.pos = 0
 
         self.current_char: Optional[str] = None
-        self.current_char = self.text[self.pos]
+        if self.text:
+            self.current_char = self.text[self.pos]
         # token line number and column number
         self.lineno = 1
         self.column = 1
 
+        # regex scanning mode: tokens are matched with a single compiled
+        # pattern and positions are computed from a newline offset index
+        self._newlines: Optional[List[int]] = None
+        self._regex_stream: Optional[Iterator[Token]] = None
+
+        # scanning buffer: the part of the input read and not yet consumed,
+        # which starts at offset `_base`. A text is a single chunk, a
+        # streamed input is read `chunk_size` at a time.
+        self._buf = self.text
+        self._base = 0
+        self._exhausted = not self._streamed
+        self._chunk_size = chunk_size
+        self._decoder: Optional[codecs.IncrementalDecoder] = None
+        # newlines of a streamed input: their number before the offset
+        # `_tracked` and the offset of the last one
+        self._lines = 0
+        self._line_start = -1
+        self._tracked = 0
+
+        if self._streamed:
+            # streamed input is always scanned in regex mode
+            self._regex_stream = self._stream_tokens()
+        elif regex:
+            self._regex_stream = self._regex_tokens()
+
     def error(self) -> LexerError:
         s = "Lexer error on '{lexeme}' line: {lineno} column: {column}".format(
             lexeme=self.current_char,
@@ -46,7 +120,15 @@ class Lexer(object):
             return self.text[peek_pos]
 
     def skip_comment(self) -> None:
+        """Skip a comment, from its '{' to its '}'."""
+        pos, lineno, column = self.pos, self.lineno, self.column
+        self.advance()
         while self.current_char != '}':
+            if self.current_char is None:
+                # never closed: an error at its '{', as in regex mode
+                self.pos, self.lineno, self.column = pos, lineno, column
+                self.current_char = '{'
+                self.error()
             self.advance()
         self.advance()
 
@@ -101,12 +183,274 @@ class Lexer(object):
                 lineno=self.lineno, column=self.column
             )
 
+    def _newline_offsets(self) -> List[int]:
+        """Offsets of every newline in the input, built on first use."""
+        if self._newlines is None:
+            self._newlines = [m.start() for m in re.finditer('\n', self.text)]
+        return self._newlines
+
+    def _read_chunk(self) -> str:
+        """Read the next chunk of a streamed input, '' at its end."""
+        data = self._source.read(self._chunk_size)  # type: ignore
+        if not data:
+            self._exhausted = True
+        if isinstance(data, str):
+            return data
+
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder('utf-8')()
+        return self._decoder.decode(data, final=not data)
+
+    def _refill(self, pos: int) -> None:
+        """Drop the buffer up to `pos` and append the next chunk to it."""
+        self._track_lines(self._base + pos)
+        buf = self._buf[pos:]
+        base = self._base + pos
+
+        # a chunk may decode to nothing, e.g. when it ends mid-character
+        chunk = ''
+        while not chunk and not self._exhausted:
+            chunk = self._read_chunk()
+        if self._newlines is not None:
+            offset = base + len(buf)
+            self._newlines.extend(
+                offset + m.start() for m in re.finditer('\n', chunk)
+            )
+
+        self._buf = buf + chunk
+        self._base = base
+
+    def _skip_comment(self, start: int) -> int:
+        """Skip a comment of a streamed input that is not closed in the
+        buffer, from its '{' at `start`, and return the buffer index after
+        its '}'.
+
+        Chunks are read until the '}' and only the new ones are searched,
+        the comment read so far being dropped from the buffer. A comment
+        never closed is an error at its '{'.
+        """
+        brace = self._base + start
+        lineno, column = self._position(brace)
+        searched = start + 1
+        while True:
+            close = self._buf.find('}', searched)
+            if close >= 0:
+                return close + 1
+            if self._exhausted:
+                self.pos = brace
+                self.current_char = '{'
+                self.lineno, self.column = lineno, column
+                self.error()
+            self._refill(len(self._buf))
+            searched = 0
+
+    def _track_lines(self, offset: int) -> None:
+        """Count the newlines of a streamed input up to `offset`."""
+        start = self._tracked - self._base
+        end = offset - self._base
+        count = self._buf.count('\n', start, end)
+        if count:
+            self._lines += count
+            self._line_start = self._buf.rfind('\n', start, end) + self._base
+        self._tracked = offset
+
+    def _position(self, offset: int) -> Tuple[int, int]:
+        """Line and column of an input offset, as the lexer reports them.
+
+        On a streamed input, offsets must be asked in increasing order.
+        """
+        if not self._streamed:
+            return offset_to_position(
+                self._newline_offsets(), len(self.text), offset
+            )
+
+        self._track_lines(offset)
+        column = offset - self._line_start
+        if self._exhausted and offset >= self._base + len(self._buf):
+            column -= 1
+        return self._lines + 1, column
+
+    def _scan(self) -> Iterator[Tuple[TokenType, TokenValue, int, int, int]]:
+        """Match whole lexemes with the master pattern, starting at `pos`.
+
+        Yields (token type, value, start, end, position offset) tuples and
+        stops at the end of the input. Multi-character tokens are stamped
+        with the position right after the lexeme and single characters
+        with their own, which is what the position offset refers to.
+
+        On a streamed input, a match that reaches the end of the buffer may
+        go on in the next chunk: the buffer is refilled, keeping the lexeme
+        but not the whitespace and comments before it, and the match
+        retried. A comment not closed in the buffer is skipped chunk by
+        chunk by `_skip_comment`.
+        """
+        text = self._buf
+        text_len = len(text)
+        base = self._base
+        final = self._exhausted
+        match_token = _TOKEN_RE.match
+        single_char_tokens = _SINGLE_CHAR_TOKENS
+        reserved_keywords = RESERVED_KEYWORDS
+        id_type = TokenType.ID
+        integer_type = TokenType.INTEGER_CONST
+        real_type = TokenType.REAL_CONST
+        assign_type = TokenType.ASSIGN
+
+        pos = self.pos - base
+        while True:
+            match = match_token(text, pos)
+            kind = 'EOF' if match is None else match.lastgroup or 'EOF'
+            # a '{' is only matched alone when its comment is not closed in
+            # the buffer
+            if not final and match is not None and (
+                match.end() == text_len or
+                kind == 'CHAR' and match.group(kind) == '{'
+            ):
+                if match.group(kind) == '{':
+                    pos = self._skip_comment(match.start(kind))
+                else:
+                    self._refill(match.start(kind))
+                    pos = 0
+                text = self._buf
+                text_len = len(text)
+                base = self._base
+                final = self._exhausted
+                continue
+            if match is None or kind == 'EOF':
+                return
+
+            start, pos = match.span(kind)
+            lexeme = match.group(kind)
+            # offsets of the lexeme in the whole input
+            start += base
+            end = base + pos
+
+            if kind == 'ID':
+                value = lexeme.upper()
+                yield (
+                    reserved_keywords.get(value, id_type), value,
+                    start, end, end
+                )
+            elif kind == 'CHAR':
+                token_type = single_char_tokens.get(lexeme)
+                if token_type is not None:
+                    yield token_type, lexeme, start, end, start
+                else:
+                    self.pos = start
+                    self.current_char = lexeme
+                    self.lineno, self.column = self._position(start)
+                    self.error()
+            elif kind == 'NUMBER':
+                if '.' in lexeme:
+                    yield real_type, float(lexeme), start, end, end
+                else:
+                    yield integer_type, int(lexeme), start, end, end
+            else:
+                yield assign_type, lexeme, start, end, end
+
+    def _regex_tokens(self) -> Iterator[Token]:
+        """Regex based alternative to the char-by-char scanner.
+
+        Produces the same tokens, positions and errors as `get_next_token`
+        does, but matches whole lexemes at once instead of advancing one
+        character at a time. Line and column numbers are computed from an
+        index of newline offsets rather than tracked on every character.
+        """
+        text = self.text
+        text_len = len(text)
+        # a sentinel so that `line_end` is always defined
+        newlines = self._newline_offsets() + [text_len]
+
+        line_index = 0
+        line_start = -1
+        line_end = newlines[0]
+        for token_type, value, _, end, token_pos in self._scan():
+            if token_pos > line_end:
+                line_index = bisect_left(newlines, token_pos, line_index)
+                line_start = newlines[line_index - 1]
+                line_end = newlines[line_index]
+            self.lineno = line_index + 1
+            self.column = token_pos - line_start
+            if token_pos == text_len:
+                # `advance` keeps the last column at the end of the input
+                self.column -= 1
+
+            self.pos = end
+            self.current_char = text[end] if end < text_len else None
+            yield Token(
+                token_type, value,
+                lineno=self.lineno, column=self.column
+            )
+
+        self.pos = text_len
+        self.current_char = None
+        while True:
+            yield Token(TokenType.EOF, None)
+
+    def _stream_tokens(self) -> Iterator[Token]:
+        """`_regex_tokens` for a streamed input, read chunk by chunk.
+
+        Positions are computed by counting the newlines of each chunk as
+        the scan goes, instead of from an index of the whole input.
+        """
+        position = self._position
+        for token_type, value, _, end, token_pos in self._scan():
+            self.lineno, self.column = position(token_pos)
+
+            self.pos = end
+            index = end - self._base
+            buf = self._buf
+            self.current_char = buf[index] if index < len(buf) else None
+            yield Token(
+                token_type, value,
+                lineno=self.lineno, column=self.column
+            )
+
+        self.pos = self._base + len(self._buf)
+        self.current_char = None
+        while True:
+            yield Token(TokenType.EOF, None)
+
+    def tokenize(self) -> TokenArray:
+        """Scan the remaining input in bulk into a columnar `TokenArray`.
+
+        Tokens are not materialized; the parser can index into the array
+        directly and positions are only computed when a `Token` is built.
+        The stream always ends with an EOF entry. A streamed input has to
+        be tokenized from its beginning.
+        """
+        if self._streamed:
+            if self.pos:
+                raise ValueError('A streamed input is tokenized from the start')
+            # newline offsets are collected as the chunks are read
+            newlines: List[int] = []
+            self._newlines = newlines
+            tokens = TokenArray(0, ())
+        else:
+            tokens = TokenArray(len(self.text), self._newline_offsets())
+
+        append = tokens.append
+        for token_type, value, start, end, _ in self._scan():
+            append(token_type, value, start, end - start)
+        text_len = self._base + len(self._buf)
+        append(TokenType.EOF, None, text_len, 0)
+
+        if self._streamed:
+            tokens.text_len = text_len
+            tokens.newlines = array('i', newlines)
+        self.pos = text_len
+        self.current_char = None
+        return tokens
+
     def get_next_token(self) -> Token:
         """Lexical analyzer (also known as scanner or tokenizer)
 
         This method is responsible for breaking a sentence
         apart into tokens. One token at a time.
         """
+        if self._regex_stream is not None:
+            return next(self._regex_stream)
+
         while self.current_char is not None:
 
             if self.current_char.isspace():
@@ -114,7 +458,6 @@ class Lexer(object):
                 continue
 
             if self.current_char == '{':
-                self.advance()
                 self.skip_comment()
                 continue
 
@@ -1,32 +1,195 @@
 from core.ast import *
-from core.token import TokenType, Token
+from core.token import TOKEN_TYPES, TokenType, Token, TokenArray
 from core.errors.parser import ParserError
 from core.errors.generic import ErrorCode
 from core.lexer import Lexer
 
-from typing import Union, List, Sequence
+from collections import deque
+from typing import (
+    Callable, Deque, Dict, FrozenSet, Union, List, Optional, Sequence, cast
+)
+
+# Binding power of every infix operator: the higher, the tighter it binds.
+# A new binary operator, relational or boolean, only needs an entry here.
+_INFIX_BINDING_POWER: Dict[TokenType, int] = {
+    TokenType.PLUS: 10,
+    TokenType.MINUS: 10,
+    TokenType.MUL: 20,
+    TokenType.INTEGER_DIV: 20,
+    TokenType.FLOAT_DIV: 20,
+}
+
+# Unary PLUS and MINUS apply to a single factor: `-a * b` is `(-a) * b`
+_PREFIX_OPERATORS = frozenset((TokenType.PLUS, TokenType.MINUS))
+_PREFIX_BINDING_POWER = 30
+
+_LITERALS = frozenset((TokenType.INTEGER_CONST, TokenType.REAL_CONST))
+
+# Tokens a recovering parser skips to after a syntax error (panic mode): the
+# end of the broken statement, or the start of the next declaration or body
+_STATEMENT_SYNC = frozenset((
+    TokenType.SEMI, TokenType.END, TokenType.DOT, TokenType.EOF,
+))
+_DECLARATION_SYNC = frozenset((
+    TokenType.SEMI, TokenType.VAR, TokenType.PROCEDURE, TokenType.FUNCTION,
+    TokenType.BEGIN, TokenType.EOF,
+))
+_HEADER_SYNC = _DECLARATION_SYNC - {TokenType.SEMI}
 
 class Parser(object):
 
-    def __init__(self, lexer: Lexer) -> None:
+    def __init__(
+        self,
+        lexer: Union[Lexer, TokenArray],
+        keep_tokens: bool = True,
+        recover: bool = False
+    ) -> None:
         self.lexer = lexer
-        # set current token to the first token taken from the input
-        self.current_token = self.lexer.get_next_token()
+        # when False, AST nodes only store the position of their token
+        self.keep_tokens = keep_tokens
+        # when True, syntax errors are collected in `errors` and parsing
+        # resumes after them, instead of stopping at the first one
+        self.recover = recover
+        self.errors: List[ParserError] = []
+        # a pre-scanned token stream (see `Lexer.tokenize`) is read column
+        # by column instead of pulling tokens from the lexer one at a time:
+        # the parser follows the type ids of the tokens, and only builds a
+        # Token for those that end up in a node or an error
+        self.tokens: Optional[TokenArray] = None
+        self.token_index = 0
+        self._type_ids: Sequence[int] = ()
+        self._last_index = 0
+        # tokens read ahead of the current one by `peek`
+        self.lookahead: Deque[Token] = deque()
+        # the type of the current token, and the token itself: None until
+        # `current_token` builds it out of the token array
+        self.current_type: TokenType
+        self._current_token: Optional[Token] = None
+        if isinstance(lexer, TokenArray):
+            self.tokens = lexer
+            self._type_ids = lexer.type_ids
+            self._last_index = len(lexer) - 1
+            self.current_type = TOKEN_TYPES[lexer.type_ids[0]]
+        else:
+            # set current token to the first token taken from the input
+            self._current_token = lexer.get_next_token()
+            self.current_type = self._current_token.type
+
+    @property
+    def current_token(self) -> Token:
+        token = self._current_token
+        if token is None:
+            tokens = cast(TokenArray, self.tokens)
+            token = self._current_token = tokens.token(self.token_index)
+        return token
+
+    def advance(self) -> None:
+        """Make the next token of the input the current one."""
+        if self.tokens is None:
+            if self.lookahead:
+                token = self.lookahead.popleft()
+            else:
+                token = self.lexer.get_next_token()  # type: ignore
+            self._current_token = token
+            self.current_type = token.type
+        # the trailing EOF token stays current once the stream is consumed
+        elif self.token_index < self._last_index:
+            self.token_index += 1
+            self.current_type = TOKEN_TYPES[self._type_ids[self.token_index]]
+            self._current_token = None
+
+    def peek(self, n: int = 1) -> Token:
+        """The n-th token after the current one, without consuming it.
+
+        Tokens pulled from a lexer wait in `lookahead` until they become
+        the current token; a token array is simply indexed ahead. Raises
+        ValueError if n is not 1 or more.
+        """
+        if n < 1:
+            raise ValueError(f'peek needs n >= 1, not {n}')
+        if self.tokens is None:
+            lookahead = self.lookahead
+            while len(lookahead) < n:
+                lookahead.append(self.lexer.get_next_token())  # type: ignore
+            return lookahead[n - 1]
+
+        # past the end of the stream, every token is the trailing EOF
+        return self.tokens.token(
+            min(self.token_index + n, self._last_index)
+        )
 
-    def error(self, error_code: ErrorCode, token: Token) -> ParserError:
-        raise ParserError(
+    def peek_type(self, n: int = 1) -> TokenType:
+        """The type of `peek(n)`, read without building a token."""
+        if self.tokens is None:
+            return self.peek(n).type
+        if n < 1:
+            raise ValueError(f'peek needs n >= 1, not {n}')
+        index = min(self.token_index + n, self._last_index)
+        return TOKEN_TYPES[self._type_ids[index]]
+
+    def syntax_error(
+        self,
+        error_code: ErrorCode,
+        token: Token
+    ) -> ParserError:
+        return ParserError(
             error_code=error_code,
             token=token,
             message=f'{error_code.value} -> {token}',
         )
 
+    def error(self, error_code: ErrorCode, token: Token) -> ParserError:
+        raise self.syntax_error(error_code, token)
+
+    def report(self, error: ParserError) -> None:
+        """Keep `error` when recovering, raise it otherwise.
+
+        Errors on the token of the last reported one are cascades of it,
+        and are dropped.
+        """
+        if not self.recover:
+            raise error
+        if self.errors:
+            last = self.errors[-1].token
+            token = error.token
+            if last is not None and token is not None and \
+                    (last.type, last.lineno, last.column) == \
+                    (token.type, token.lineno, token.column):
+                return
+        self.errors.append(error)
+
+    def synchronize(
+        self,
+        error: ParserError,
+        sync: FrozenSet[TokenType]
+    ) -> None:
+        """Report `error`, then skip the tokens before one of `sync`."""
+        self.report(error)
+        while self.current_type not in sync:
+            self.advance()
+
+    def expect(self, token_type: TokenType) -> None:
+        """Eat `token_type`; when recovering, a missing one is reported and
+        parsing goes on as if it was there."""
+        if self.current_type == token_type:
+            self.advance()
+        elif self.recover:
+            self.report(self.syntax_error(
+                ErrorCode.UNEXPECTED_TOKEN, self.current_token
+            ))
+        else:
+            self.error(
+                error_code=ErrorCode.UNEXPECTED_TOKEN,
+                token=self.current_token
+            )
+
     def eat(self, token_type: TokenType) -> None:
         # compare the current token type with the passed token
         # type and if they match then "eat" the current token
         # and assign the next token to the self.current_token,
         # otherwise raise an exception.
-        if self.current_token.type == token_type:
-            self.current_token = self.lexer.get_next_token()
+        if self.current_type == token_type:
+            self.advance()
         else:
             self.error(
                 error_code=ErrorCode.UNEXPECTED_TOKEN,
@@ -40,67 +203,59 @@ class Parser(object):
                   | REAL_CONST
                   | LPAREN expr RPAREN
                   | variable"""
-        token = self.current_token
+        token_type = self.current_type
 
-        if token.type in (TokenType.MINUS, TokenType.PLUS):
-            self.eat(token.type)
-            return UnaryOp(token, self.factor())
-        elif token.type == TokenType.INTEGER_CONST:
-            self.eat(TokenType.INTEGER_CONST)
-            return Num(token)
-        elif token.type == TokenType.REAL_CONST:
-            self.eat(TokenType.REAL_CONST)
-            return Num(token)
-        elif token.type == TokenType.LPAREN:
-            self.eat(TokenType.LPAREN)
+        if token_type == TokenType.ID:
+            return self.variable()
+        elif token_type in _LITERALS:
+            token = self.current_token
+            self.advance()
+            return Num(token, self.keep_tokens)
+        elif token_type in _PREFIX_OPERATORS:
+            token = self.current_token
+            self.advance()
+            return UnaryOp(
+                token, self.expr(_PREFIX_BINDING_POWER), self.keep_tokens
+            )
+        elif token_type == TokenType.LPAREN:
+            self.advance()
             subtree = self.expr()
             self.eat(TokenType.RPAREN)
             return subtree
         else:
+            # not an operand: reports the unexpected token
             return self.variable()
 
-    def term(self) -> Union[UnaryOp, Num, Var, BinOp]:
-        """term : factor ((MUL | INTEGER_DIV | FLOAT_DIV) factor)*"""
-        node = self.factor()
-
-        while self.current_token.type in (
-            TokenType.MUL, TokenType.INTEGER_DIV, TokenType.FLOAT_DIV
-        ):
-            token = self.current_token
-
-            if token.type == TokenType.MUL:
-                self.eat(TokenType.MUL)
-            elif token.type == TokenType.INTEGER_DIV:
-                self.eat(TokenType.INTEGER_DIV)
-            elif token.type == TokenType.FLOAT_DIV:
-                self.eat(TokenType.FLOAT_DIV)
-
-            node = BinOp(left=node, right=self.factor(), op=token)
-
-        return node
-
-    def expr(self) -> Union[UnaryOp, Num, Var, BinOp]:
-        """Arithmetic expression parser / interpreter.
+    def expr(
+        self,
+        min_binding_power: int = 0
+    ) -> Union[UnaryOp, Num, Var, BinOp]:
+        """Arithmetic expression parser, by precedence climbing.
 
         calc> 7 + 3 * (10 / (12 / (3 + 1) - 1))
         22
 
-        expr   : term ((PLUS | MINUS) term)*
-        term   : factor ((MUL | DIV) factor)*
-        factor : (PLUS | MINUS)factor| INTEGER | LPAREN expr RPAREN
+        expr   : factor (INFIX_OPERATOR factor)*
+        factor : (PLUS | MINUS) factor | INTEGER | LPAREN expr RPAREN
+
+        Operators are taken from `_INFIX_BINDING_POWER` while they bind
+        tighter than `min_binding_power`; their right operand is parsed at
+        their own binding power, so they all associate to the left.
         """
-        node = self.term()
+        node = self.factor()
+        binding_powers = _INFIX_BINDING_POWER
+        keep_tokens = self.keep_tokens
 
-        while self.current_token.type in (TokenType.PLUS, TokenType.MINUS):
+        while True:
+            binding_power = binding_powers.get(self.current_type, 0)
+            if binding_power <= min_binding_power:
+                return node
             token = self.current_token
-            if token.type == TokenType.PLUS:
-                self.eat(TokenType.PLUS)
-            elif token.type == TokenType.MINUS:
-                self.eat(TokenType.MINUS)
-
-            node = BinOp(left=node, right=self.term(), op=token)
-
-        return node
+            self.advance()
+            node = BinOp(
+                left=node, right=self.expr(binding_power), op=token,
+                keep_token=keep_tokens
+            )
 
     def empty(self) -> NoOp:
         """
@@ -112,9 +267,10 @@ class Parser(object):
         """
         variable: ID
         """
-        node = Var(self.current_token)
+        # the token is checked before the node is built out of it
+        token = self.current_token
         self.eat(TokenType.ID)
-        return node
+        return Var(token, self.keep_tokens)
 
     def assignment_statement(self) -> Assign:
         """
@@ -126,13 +282,29 @@ class Parser(object):
         self.eat(TokenType.ASSIGN)
 
         expr = self.expr()
-        return Assign(var, token, expr)
+        return Assign(var, token, expr, self.keep_tokens)
 
     def compound_statement(self) -> Compound:
         """compound_statement : BEGIN statement_list END"""
-        self.eat(TokenType.BEGIN)
+        self.expect(TokenType.BEGIN)
         nodes = self.statement_list()
-        self.eat(TokenType.END)
+
+        # when recovering, the statements after tokens that cannot follow
+        # one are parsed as well
+        while self.recover and self.current_type not in (
+            TokenType.END, TokenType.DOT, TokenType.EOF
+        ):
+            self.synchronize(
+                self.syntax_error(
+                    ErrorCode.UNEXPECTED_TOKEN, self.current_token
+                ),
+                _STATEMENT_SYNC,
+            )
+            if self.current_type == TokenType.SEMI:
+                self.eat(TokenType.SEMI)
+                nodes.extend(self.statement_list())
+
+        self.expect(TokenType.END)
 
         root = Compound()
         for node in nodes:
@@ -151,16 +323,18 @@ class Parser(object):
         self.eat(TokenType.ID)
         self.eat(TokenType.LPAREN)
 
-        if self.current_token.type != TokenType.RPAREN:
+        if self.current_type != TokenType.RPAREN:
             actual_params.append(self.expr())
 
-        while self.current_token.type == TokenType.COMMA:
+        while self.current_type == TokenType.COMMA:
             self.eat(TokenType.COMMA)
             actual_params.append(self.expr())
 
         self.eat(TokenType.RPAREN)
 
-        return ProcedureCall(proc_name, actual_params, token)
+        return ProcedureCall(
+            proc_name, actual_params, token, self.keep_tokens
+        )
 
     def statement(self) -> Union[NoOp, Compound, ProcedureCall, Assign]:
         """
@@ -169,58 +343,76 @@ class Parser(object):
                   | assignment_statement
                   | empty
         """
-        if self.current_token.type == TokenType.BEGIN:
-            return self.compound_statement()
-        elif (self.current_token.type == TokenType.ID and
-            self.lexer.current_char == '('
-        ):
-            return self.procall_statement()
-        elif self.current_token.type == TokenType.ID:
-            return self.assignment_statement()
-        else:
+        parse_statement = _STATEMENTS.get(self.current_type)
+        if parse_statement is None:
             return self.empty()
+        return parse_statement(self)
+
+    def id_statement(self) -> Union[ProcedureCall, Assign]:
+        """A call or an assignment, which both start with an ID."""
+        if self.peek_type() == TokenType.LPAREN:
+            return self.procall_statement()
+        return self.assignment_statement()
 
     def statement_list(self) -> List[
             Union[NoOp, Compound, ProcedureCall, Assign]
         ]:
         """statement_list : statement
                           | statement SEMI statement_list"""
-        node = self.statement()
-        results = [node]
-
-        while self.current_token.type == TokenType.SEMI:
-            self.eat(TokenType.SEMI)
-            results.append(self.statement())
-
-        if self.current_token.type == TokenType.ID:
-            self.error(
-                error_code=ErrorCode.UNEXPECTED_TOKEN,
-                token=self.current_token
-            )
+        results = [self.recovered_statement()]
 
-        return results
+        while True:
+            token_type = self.current_type
+            if token_type == TokenType.SEMI:
+                self.eat(TokenType.SEMI)
+            elif token_type == TokenType.ID or (
+                self.recover and token_type == TokenType.BEGIN
+            ):
+                # a statement right after another: the SEMI is missing
+                self.report(self.syntax_error(
+                    ErrorCode.UNEXPECTED_TOKEN, self.current_token
+                ))
+            else:
+                return results
+            results.append(self.recovered_statement())
+
+    def recovered_statement(
+        self
+    ) -> Union[NoOp, Compound, ProcedureCall, Assign]:
+        """A statement; when recovering, a broken one is reported, skipped
+        up to its end and replaced with a NoOp."""
+        if not self.recover:
+            return self.statement()
+        try:
+            return self.statement()
+        except ParserError as error:
+            self.synchronize(error, _STATEMENT_SYNC)
+            return self.empty()
 
     def type_spec(self) -> Type:
         """type_spec : INTEGER
                      | REAL
         """
         token = self.current_token
-        if token.type == TokenType.INTEGER:
+        if self.current_type == TokenType.INTEGER:
             self.eat(TokenType.INTEGER)
-        elif token.type == TokenType.REAL:
+        elif self.current_type == TokenType.REAL:
             self.eat(TokenType.REAL)
+        else:
+            self.error(
+                error_code=ErrorCode.UNEXPECTED_TOKEN,
+                token=token
+            )
 
-        return Type(token)
+        return Type(token, self.keep_tokens)
 
     def variable_declaration(self) -> List[VarDecl]:
         """variable_declaration : ID (COMMA ID)* COLON type_spec"""
-        var_nodes = [Var(self.current_token)]  # first ID
-        self.eat(TokenType.ID)
+        var_nodes = [self.variable()]  # first ID
 
-        while self.current_token.type == TokenType.COMMA:
+        while self.current_type == TokenType.COMMA:
             self.eat(TokenType.COMMA)
-            var_nodes.append(Var(self.current_token))
-            self.eat(TokenType.ID)
+            var_nodes.append(self.variable())
 
         self.eat(TokenType.COLON)
         type_node = self.type_spec()
@@ -233,13 +425,11 @@ class Parser(object):
 
     def formal_parameters(self) -> List[Param]:
         """ formal_parameters : ID (COMMA ID)* COLON type_spec """
-        var_nodes = [Var(self.current_token)]
-        self.eat(TokenType.ID)
+        var_nodes = [self.variable()]
 
-        while self.current_token.type == TokenType.COMMA:
+        while self.current_type == TokenType.COMMA:
             self.eat(TokenType.COMMA)
-            var_nodes.append(Var(self.current_token))
-            self.eat(TokenType.ID)
+            var_nodes.append(self.variable())
 
         self.eat(TokenType.COLON)
         param_type = self.type_spec()
@@ -250,11 +440,11 @@ class Parser(object):
         """ formal_parameter_list : formal_parameters
                                   | formal_parameters SEMI formal_parameter_list
         """
-        if not self.current_token.type == TokenType.ID:
+        if not self.current_type == TokenType.ID:
             return []
 
         param_nodes = self.formal_parameters()
-        while self.current_token.type == TokenType.SEMI:
+        while self.current_type == TokenType.SEMI:
             self.eat(TokenType.SEMI)
             param_nodes.extend(self.formal_parameters())
 
@@ -270,31 +460,44 @@ class Parser(object):
         declarations = []
 
         # Parse variable declarations
-        while self.current_token.type == TokenType.VAR:
+        while self.current_type == TokenType.VAR:
             self.eat(TokenType.VAR)
-            while self.current_token.type == TokenType.ID:
-                var_decl = self.variable_declaration()
-                declarations.extend(var_decl)
-                self.eat(TokenType.SEMI)
+            while self.current_type == TokenType.ID:
+                try:
+                    var_decl = self.variable_declaration()
+                    declarations.extend(var_decl)
+                    self.eat(TokenType.SEMI)
+                except ParserError as error:
+                    # skip the broken declaration, up to its SEMI
+                    self.synchronize(error, _DECLARATION_SYNC)
+                    if self.current_type == TokenType.SEMI:
+                        self.eat(TokenType.SEMI)
 
         # Parse procedure/function declarations
-        while self.current_token.type in (TokenType.PROCEDURE, TokenType.FUNCTION):
-            op = self.current_token.type
-            self.eat(self.current_token.type)
-
-            proc_fn_name = f'{self.current_token.value}'
-            self.eat(TokenType.ID)
+        while self.current_type in (TokenType.PROCEDURE, TokenType.FUNCTION):
+            op = self.current_type
+            self.eat(self.current_type)
+
+            name_token = self.current_token
+            proc_fn_name = f'{name_token.value}'
+            params: List[Param] = []
+            return_type: Optional[Type] = None
+            try:
+                self.eat(TokenType.ID)
+
+                if self.current_type == TokenType.LPAREN:
+                    self.eat(TokenType.LPAREN)
+                    params = self.formal_parameter_list()
+                    self.eat(TokenType.RPAREN)
+
+                if op == TokenType.FUNCTION:
+                    self.eat(TokenType.COLON)
+                    return_type = self.type_spec()
 
-            if self.current_token.type == TokenType.LPAREN:
-                self.eat(TokenType.LPAREN)
-                params = self.formal_parameter_list()
-                self.eat(TokenType.RPAREN)
-
-            if op == TokenType.FUNCTION:
-                self.eat(TokenType.COLON)
-                return_type = self.type_spec()
-
-            self.eat(TokenType.SEMI)
+                self.eat(TokenType.SEMI)
+            except ParserError as error:
+                # skip the rest of the heading; its block is parsed anyway
+                self.synchronize(error, _HEADER_SYNC)
 
             block_node = self.block()
 
@@ -303,11 +506,18 @@ class Parser(object):
                     ProcedureDecl(proc_fn_name, params, block_node)
                 )
             else:
+                if return_type is None:
+                    # the missing return type was reported: the function
+                    # returns an INTEGER, so its uses are still analyzed
+                    return_type = Type(Token(
+                        TokenType.INTEGER, TokenType.INTEGER.value,
+                        lineno=name_token.lineno, column=name_token.column
+                    ))
                 declarations.append(
                     FunctionDecl(proc_fn_name, params, block_node, return_type)
                 )
 
-            self.eat(TokenType.SEMI)
+            self.expect(TokenType.SEMI)
 
         return declarations
 
@@ -321,23 +531,43 @@ class Parser(object):
 
     def program(self) -> Program:
         """program : PROGRAM variable SEMI block DOT"""
-        self.eat(TokenType.PROGRAM)
-        var_node = self.variable()
-        prog_name = f'{var_node.value}'
-        self.eat(TokenType.SEMI)
+        prog_name = ''
+        try:
+            self.eat(TokenType.PROGRAM)
+            var_node = self.variable()
+            prog_name = f'{var_node.value}'
+            self.eat(TokenType.SEMI)
+        except ParserError as error:
+            self.synchronize(error, _HEADER_SYNC)
 
         block_node = self.block()
         program_node = Program(prog_name, block_node)
 
-        self.eat(TokenType.DOT)
+        self.expect(TokenType.DOT)
         return program_node
 
     def parse(self) -> Program:
+        """Parse the whole program.
+
+        When recovering, every syntax error is in `errors` afterwards, and
+        the tree returned is partial if there are any: broken statements
+        are NoOps and broken declarations are left out.
+        """
         node = self.program()
-        if self.current_token.type != TokenType.EOF:
-            self.error(
-                error_code=ErrorCode.UNEXPECTED_TOKEN,
-                token=self.current_token
-            )
+        if self.current_type != TokenType.EOF:
+            self.report(self.syntax_error(
+                ErrorCode.UNEXPECTED_TOKEN, self.current_token
+            ))
+
+        return node
+
 
-        return node
\ No newline at end of file
+# The statement starting with every token; any other token starts an empty
+# statement. A new kind of statement only needs an entry here.
+_STATEMENTS: Dict[
+    TokenType,
+    Callable[[Parser], Union[Compound, ProcedureCall, Assign]]
+] = {
+    TokenType.BEGIN: Parser.compound_statement,
+    TokenType.ID: Parser.id_statement,
+}
@@ -0,0 +1,148 @@
+###############################################################################
+#                                                                             #
+#  PROFILING                                                                  #
+#                                                                             #
+###############################################################################
+#
+# Cost of every phase of a run, printed with --profile. Each phase is run in
+# `Profiler.phase`, which records its wall time, CPU time, and the peak and
+# retained memory it allocates, traced with tracemalloc; the caller adds the
+# number of tokens or nodes it handled. Tracing allocations slows Python down,
+# so the times are only comparable with each other. One phase can also be run
+# under cProfile. Without --profile, main gets a NullProfiler, whose phases
+# cost nothing.
+import contextlib
+import io
+import time
+import tracemalloc
+
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+from core.ast import AST
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+def count_nodes(node) -> int:
+    """Number of AST nodes in a tree, or in a list of trees."""
+    if isinstance(node, list):
+        return sum(count_nodes(n) for n in node)
+    if not isinstance(node, AST):
+        return 0
+    count = 1
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if not name.startswith('_') and hasattr(node, name):
+                count += count_nodes(getattr(node, name))
+    return count
+
+
+class PhaseProfile(object):
+    """Measures of one phase; `count` and `unit` are set by the caller."""
+    __slots__ = ('name', 'wall', 'cpu', 'retained', 'peak', 'count', 'unit')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.retained = 0
+        self.peak = 0
+        self.count: Optional[int] = None
+        self.unit = ''
+
+
+class Profiler(object):
+    """Record the phases of a run, and cProfile the one named `cprofile`.
+
+    The cProfile statistics are dumped to `cprofile_output` if it is given,
+    for pstats or snakeviz, and printed in the report otherwise.
+    """
+    enabled = True
+
+    def __init__(
+        self,
+        cprofile: Optional[str] = None,
+        cprofile_output: Optional[str] = None,
+    ) -> None:
+        self.phases: List[PhaseProfile] = []
+        self.cprofile = cprofile
+        self.cprofile_output = cprofile_output
+        # the cProfile profiler of the `cprofile` phase, once it has run
+        self.profiler: Optional['cProfile.Profile'] = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[PhaseProfile]:
+        profile = PhaseProfile(name)
+        profiler = None
+        if name == self.cprofile:
+            # cProfile and pstats are only imported when they are used
+            import cProfile
+            profiler = cProfile.Profile()
+        tracemalloc.start()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield profile
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            profile.cpu = time.process_time() - cpu
+            profile.wall = time.perf_counter() - wall
+            profile.retained, profile.peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.phases.append(profile)
+            if profiler is not None:
+                self.profiler = profiler
+                if self.cprofile_output:
+                    profiler.dump_stats(self.cprofile_output)
+
+    def report(self) -> str:
+        row = '{:<12} {:>9} {:>9} {:>12} {:>12} {:>14} {:>12}'
+        lines = [row.format(
+            'phase', 'wall (s)', 'cpu (s)', 'kept (KiB)', 'peak (KiB)',
+            'handled', 'per second',
+        )]
+        lines.append('-' * len(lines[0]))
+        for phase in self.phases:
+            handled = per_second = ''
+            if phase.count is not None:
+                handled = f'{phase.count:,} {phase.unit}'
+                if phase.wall:
+                    per_second = f'{phase.count / phase.wall:,.0f}'
+            lines.append(row.format(
+                phase.name, f'{phase.wall:.4f}', f'{phase.cpu:.4f}',
+                f'{phase.retained / 1024:,.0f}', f'{phase.peak / 1024:,.0f}',
+                handled, per_second,
+            ))
+
+        if self.profiler is not None:
+            if self.cprofile_output:
+                lines.append(
+                    f'cProfile of {self.cprofile} written to '
+                    f'{self.cprofile_output}'
+                )
+            else:
+                import pstats
+                out = io.StringIO()
+                stats = pstats.Stats(self.profiler, stream=out)
+                stats.sort_stats('cumulative').print_stats(20)
+                lines.append(f'cProfile of {self.cprofile}')
+                lines.append(out.getvalue().rstrip())
+        elif self.cprofile:
+            lines.append(f'No {self.cprofile} phase was run to profile')
+        return '\n'.join(lines)
+
+
+class NullProfiler(Profiler):
+    """Profiler of a run without --profile: runs the phases as they are."""
+    enabled = False
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[PhaseProfile]:
+        yield PhaseProfile(name)
+
+    def report(self) -> str:
+        return ''
@@ -0,0 +1,86 @@
+###############################################################################
+#                                                                             #
+#  AST RENDERING                                                              #
+#                                                                             #
+###############################################################################
+#
+# The optional visualization stage of main.py (--viz). An AST is streamed to
+# its file as DOT or JSON by the ASTVisualizer, cut down to a depth, a number
+# of nodes or a single procedure if asked, so huge programs stay viewable.
+# A PngRenderer then turns DOT files into PNG images with a single `dot`
+# process, run in the background: main starts it before interpreting the
+# program and only waits for it afterwards, so rendering never delays a run.
+# Without graphviz, the DOT files are still written and the rendering is
+# reported as skipped.
+import os
+import shutil
+import subprocess
+
+from typing import Any, List, Optional
+
+
+def write_ast(tree, path: str, **options: Any) -> None:
+    """Stream an AST to the file `path`, as DOT or JSON.
+
+    The options are those of the ASTVisualizer: `format`, `max_depth`,
+    `max_nodes`, `procedure` and `collapse`. Raises ValueError, before the
+    file is created, if there is no procedure of that name.
+    """
+    from core.visitors.ast import ASTVisualizer
+
+    visualizer = ASTVisualizer(tree, **options)
+    root = visualizer.root()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        visualizer.write(f, root)
+
+
+class PngRenderer(object):
+    """Render DOT files into `png_dir`, in one background `dot` process.
+
+    `dot -O` writes `name.dot.png` next to every input; `wait` moves them
+    to `png_dir` as `name.png` once the process is done.
+    """
+
+    def __init__(self, png_dir: str) -> None:
+        self.png_dir = png_dir
+        self.dot_paths: List[str] = []
+        self.process: Optional[subprocess.Popen] = None
+        self.error: Optional[str] = None
+
+    def start(self, dot_paths: List[str]) -> None:
+        self.dot_paths = list(dot_paths)
+        if not self.dot_paths:
+            return
+        executable = shutil.which('dot')
+        if executable is None:
+            self.error = 'graphviz `dot` was not found'
+            return
+        self.process = subprocess.Popen(
+            [executable, '-Tpng', '-O', *self.dot_paths],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+    def wait(self) -> List[str]:
+        """Wait for the rendering; return the PNG files it wrote."""
+        if self.process is None:
+            return []
+        _, stderr = self.process.communicate()
+        if self.process.returncode:
+            self.error = (
+                stderr.strip() or
+                f'dot exited with status {self.process.returncode}'
+            )
+
+        os.makedirs(self.png_dir, exist_ok=True)
+        rendered = []
+        for dot_path in self.dot_paths:
+            output = f'{dot_path}.png'
+            if os.path.exists(output):
+                stem = os.path.splitext(os.path.basename(dot_path))[0]
+                png_path = os.path.join(self.png_dir, f'{stem}.png')
+                os.replace(output, png_path)
+                rendered.append(png_path)
+        return rendered
@@ -1,10 +1,6 @@
-import ast
-import os
-
 from typing import OrderedDict
 
-
-_SHOULD_LOG_SCOPE = ast.literal_eval(os.environ['_SHOULD_LOG_SCOPE'])
+from core import tracing
 
 
 class Symbol(object):
@@ -30,6 +26,8 @@ class BuiltinTypeSymbol(Symbol):
 class VarSymbol(Symbol):
     def __init__(self, name, type):
         super().__init__(name, type)
+        # index of the variable in its scope's activation record
+        self.slot = None
 
     def __str__(self):
         return '<{name}:{type}>'.format(name=self.name, type=self.type)
@@ -79,13 +77,12 @@ class ScopedSymbolTable(object):
         self.scope_level = level
         self.scope_name = name
         self.enclosing_scope = enclosing_scope
+        self.log = tracing.tracer(tracing.SCOPE, '  ')
+        # names of the variables defined in this scope, by slot
+        self.slot_names = []
         if self.enclosing_scope == None:
             self._init_builtin()
 
-    def log(self, msg):
-        if _SHOULD_LOG_SCOPE:
-            print(f'  {msg}')
-
     def _init_builtin(self):
         self.define(BuiltinTypeSymbol('INTEGER'))
         self.define(BuiltinTypeSymbol('REAL'))
@@ -115,13 +112,18 @@ class ScopedSymbolTable(object):
     __repr__ = __str__
 
     def define(self, symbol):
-        self.log(f'Define: {symbol}')
+        if self.log.enabled:
+            self.log(f'Define: {symbol}')
         symbol.scope_level = self.scope_level
+        if isinstance(symbol, VarSymbol):
+            symbol.slot = len(self.slot_names)
+            self.slot_names.append(symbol.name)
 
         self._symbols[symbol.name] = symbol
 
     def lookup(self, name, current_scope_only=False, with_scope=None):
-        self.log(f'Lookup: {name}. (Scope name: {self.scope_name})')
+        if self.log.enabled:
+            self.log(f'Lookup: {name}. (Scope name: {self.scope_name})')
         symbol = self._symbols.get(name)
 
         # 'symbol' is either an instance of the Symbol class or 'None'
@@ -137,3 +139,118 @@ class ScopedSymbolTable(object):
         # recursively go up the chain and lookup the name
         if self.enclosing_scope is not None:
             return self.enclosing_scope.lookup(name, with_scope=with_scope)
+
+class FlatSymbolTable(ScopedSymbolTable):
+    """Scoped symbol table with O(1) lookups, LeBlanc-Cook style.
+
+    All the scopes of a program share one map from every name to the stack
+    of its visible definitions, innermost last, and the list of the open
+    scopes, by level. A scope pushes its definitions on the stacks and pops
+    them when it is closed, so looking a name up is a single dict access
+    instead of a walk up the enclosing scopes.
+
+    Scopes are entered and left as with ScopedSymbolTable: creating a scope
+    closes the open scopes of the same or deeper levels, and using a scope
+    closes the ones deeper than it. Creating a scope in a closed one opens
+    that one again; lookups from a closed scope still walk up its
+    enclosing scopes.
+    """
+    def __init__(self, level, name, enclosing_scope=None):
+        if enclosing_scope is None:
+            # name -> [(scope, symbol), ...] and the open scopes by level
+            self._stacks = {}
+            self._open_scopes = []
+        else:
+            self._stacks = enclosing_scope._stacks
+            self._open_scopes = enclosing_scope._open_scopes
+            enclosing_scope._reopen()
+        self._close_scopes(level - 1)
+        self._open_scopes.append(self)
+        super().__init__(level, name, enclosing_scope)
+
+    def _close_scopes(self, level):
+        """Pop the definitions of the open scopes deeper than `level`."""
+        open_scopes = self._open_scopes
+        stacks = self._stacks
+        while open_scopes and open_scopes[-1].scope_level > level:
+            scope = open_scopes.pop()
+            for name in scope._symbols:
+                stack = stacks[name]
+                stack.pop()
+                if not stack:
+                    del stacks[name]
+
+    def _reopen(self):
+        """Open this scope and its enclosing ones again, if closed."""
+        closed = []
+        scope = self
+        while scope is not None and not scope._is_open():
+            closed.append(scope)
+            scope = scope.enclosing_scope
+        if not closed:
+            return
+        self._close_scopes(scope.scope_level if scope is not None else 0)
+        for scope in reversed(closed):
+            self._open_scopes.append(scope)
+            for name, symbol in scope._symbols.items():
+                self._stacks.setdefault(name, []).append((scope, symbol))
+
+    def _is_open(self):
+        open_scopes = self._open_scopes
+        level = self.scope_level
+        return len(open_scopes) >= level and open_scopes[level - 1] is self
+
+    def define(self, symbol):
+        if self._open_scopes[-1] is not self and self._is_open():
+            self._close_scopes(self.scope_level)
+        if self._open_scopes[-1] is self:
+            stack = self._stacks.setdefault(symbol.name, [])
+            if symbol.name in self._symbols:
+                # redefined in this scope: replaces the previous definition
+                stack[-1] = (self, symbol)
+            else:
+                stack.append((self, symbol))
+        super().define(symbol)
+
+    def lookup(self, name, current_scope_only=False, with_scope=None):
+        if current_scope_only:
+            if self.log.enabled:
+                self.log(f'Lookup: {name}. (Scope name: {self.scope_name})')
+            symbol = self._symbols.get(name)
+            if symbol is None:
+                return None
+            return (symbol, self.scope_level) if with_scope else symbol
+
+        if self._open_scopes[-1] is self:
+            stack = self._stacks.get(name)
+            entry = stack[-1] if stack else None
+        elif self._is_open():
+            self._close_scopes(self.scope_level)
+            stack = self._stacks.get(name)
+            entry = stack[-1] if stack else None
+        else:
+            entry = None
+            scope = self
+            while scope is not None:
+                symbol = scope._symbols.get(name)
+                if symbol is not None:
+                    entry = (scope, symbol)
+                    break
+                scope = scope.enclosing_scope
+
+        if self.log.enabled:
+            self._log_lookup(name, entry[0] if entry else None)
+
+        if entry is None:
+            return None
+        scope, symbol = entry
+        return (symbol, scope.scope_level) if with_scope else symbol
+
+    def _log_lookup(self, name, found_in):
+        """Log the scopes ScopedSymbolTable would search, up to `found_in`."""
+        scope = self
+        while scope is not None:
+            scope.log(f'Lookup: {name}. (Scope name: {scope.scope_name})')
+            if scope is found_in:
+                break
+            scope = scope.enclosing_scope
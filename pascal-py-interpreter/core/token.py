@@ -2,8 +2,10 @@
 #
 # EOF (end-of-file) token is used to indicate that
 # there is no more input left for lexical analysis
+from array import array
+from bisect import bisect_left
 from enum import Enum
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 class TokenType(Enum):
     # single-character token types
@@ -65,11 +67,37 @@ def _build_reserved_keywords() -> Dict[str, TokenType]:
 
 RESERVED_KEYWORDS = _build_reserved_keywords()
 
+# Integer ids used to store token types compactly, e.g. in a TokenArray
+TOKEN_TYPES = list(TokenType)
+TOKEN_TYPE_IDS = {token_type: i for i, token_type in enumerate(TOKEN_TYPES)}
+
+TokenValue = Union[int, float, str, None]
+
+def offset_to_position(
+    newlines: Sequence[int],
+    text_len: int,
+    offset: int
+) -> Tuple[int, int]:
+    """Line and column of a source offset, as the lexer reports them.
+
+    `newlines` holds the sorted offsets of every newline in the source.
+    An offset at the end of the input keeps the column of the last
+    character, just like `Lexer.advance` does.
+    """
+    line_index = bisect_left(newlines, offset)
+    line_start = newlines[line_index - 1] if line_index else -1
+    column = offset - line_start
+    if offset >= text_len:
+        column -= 1
+    return line_index + 1, column
+
 class Token(object):
+    __slots__ = ('type', 'value', 'lineno', 'column')
+
     def __init__(
         self,
         type: TokenType,
-        value: Union[int, float, str, None],
+        value: TokenValue,
         lineno: Optional[int] = None,
         column: Optional[int] = None
     ) -> None:
@@ -94,4 +122,82 @@ class Token(object):
         )
 
     def __repr__(self) -> str:
-        return self.__str__()
\ No newline at end of file
+        return self.__str__()
+
+class TokenArray(object):
+    """A whole token stream stored column by column.
+
+    Each token is an index into parallel `array('i')` columns: its type id
+    (see TOKEN_TYPE_IDS), the offset and length of its lexeme in the
+    source, and the id of its value in the interned `values` table. Token
+    objects are only built on demand, by `token()`.
+    """
+    def __init__(self, text_len: int, newlines: Sequence[int]) -> None:
+        self.type_ids = array('i')
+        self.offsets = array('i')
+        self.lengths = array('i')
+        self.value_ids = array('i')
+        self.values: List[TokenValue] = []
+        self._value_index: Dict[Tuple[int, TokenValue], int] = {}
+        # needed to compute token positions lazily
+        self.text_len = text_len
+        self.newlines = array('i', newlines)
+
+    def __len__(self) -> int:
+        return len(self.type_ids)
+
+    def append(
+        self,
+        type: TokenType,
+        value: TokenValue,
+        offset: int,
+        length: int
+    ) -> None:
+        type_id = TOKEN_TYPE_IDS[type]
+        # the type id is part of the key so that 1 and 1.0 stay distinct
+        key = (type_id, value)
+        value_id = self._value_index.get(key)
+        if value_id is None:
+            value_id = self._value_index[key] = len(self.values)
+            self.values.append(value)
+
+        self.type_ids.append(type_id)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.value_ids.append(value_id)
+
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.type_ids[index]]
+
+    def value(self, index: int) -> TokenValue:
+        return self.values[self.value_ids[index]]
+
+    def position(self, index: int) -> Tuple[int, int]:
+        """Line and column of a token, as `Lexer.get_next_token` stamps it.
+
+        Single-character tokens are stamped with the position of their
+        character, all other tokens with the position right after them.
+        """
+        offset = self.offsets[index]
+        if self.type_ids[index] not in _SINGLE_CHAR_TYPE_IDS:
+            offset += self.lengths[index]
+        return offset_to_position(self.newlines, self.text_len, offset)
+
+    def token(self, index: int) -> Token:
+        token_type = self.type(index)
+        if token_type == TokenType.EOF:
+            return Token(token_type, None)
+
+        lineno, column = self.position(index)
+        return Token(
+            token_type, self.value(index),
+            lineno=lineno, column=column
+        )
+
+    __getitem__ = token
+
+_SINGLE_CHAR_TYPE_IDS = frozenset(
+    TOKEN_TYPE_IDS[token_type]
+    for token_type in TokenType
+    if len(token_type.value) == 1
+)
@@ -0,0 +1,82 @@
+###############################################################################
+#                                                                             #
+#  TRACING                                                                    #
+#                                                                             #
+###############################################################################
+#
+# Scope and stack traces, printed with --scope and --stack. The channels are
+# switched on with `configure`; every component asks for a Tracer when it is
+# created and gets a NullTracer for a disabled channel. Callers check
+# `enabled` before formatting a message, so a disabled trace costs one
+# attribute check and never formats symbols or activation records.
+#
+# The channels are global to the process: code running programs from
+# several threads passes `enabled` to `tracer` instead, through the `trace`
+# argument of the engines.
+import contextlib
+
+from typing import Iterator, Optional, Set
+
+SCOPE = 'scope'
+STACK = 'stack'
+
+_enabled: Set[str] = set()
+
+
+def configure(scope: bool = False, stack: bool = False) -> None:
+    """Enable the given channels, for the components created afterwards."""
+    _enabled.clear()
+    if scope:
+        _enabled.add(SCOPE)
+    if stack:
+        _enabled.add(STACK)
+
+
+@contextlib.contextmanager
+def configured(scope: bool = False, stack: bool = False) -> Iterator[None]:
+    """Enable the given channels inside a with block only."""
+    previous = set(_enabled)
+    configure(scope, stack)
+    try:
+        yield
+    finally:
+        _enabled.clear()
+        _enabled.update(previous)
+
+
+def is_enabled(channel: str) -> bool:
+    return channel in _enabled
+
+
+class Tracer(object):
+    """Print the messages of a channel, after the component's prefix."""
+    __slots__ = ('prefix',)
+    enabled = True
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+
+    def __call__(self, msg: str) -> None:
+        print(f'{self.prefix}{msg}')
+
+
+class NullTracer(Tracer):
+    """Tracer of a disabled channel: drops every message."""
+    __slots__ = ()
+    enabled = False
+
+    def __call__(self, msg: str) -> None:
+        pass
+
+
+def tracer(
+    channel: str,
+    prefix: str,
+    enabled: Optional[bool] = None
+) -> Tracer:
+    """Tracer of a channel; `enabled` overrides the configured channels."""
+    if enabled is None:
+        enabled = channel in _enabled
+    if enabled:
+        return Tracer(prefix)
+    return NullTracer(prefix)
@@ -1,203 +1,283 @@
+import abc
+import io
+import json
+import textwrap
+
+from typing import IO, Callable, Dict, List, Optional, Tuple
+
+from core.ast import *
 from core.visitors.node_visitor import NodeVisitor
 
-import textwrap
+FORMATS = ('dot', 'json')
 
-class ASTVisualizer(NodeVisitor):
-    def __init__(self, tree):
-        self.tree = tree
-        self.ncount = 1
-        self.dot_header = [textwrap.dedent("""\
+
+class _Emitter(abc.ABC):
+    """Writes the nodes of a tree to `out` as ASTVisualizer visits them."""
+
+    def __init__(self, out: IO[str]) -> None:
+        self.write = out.write
+
+    def begin(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def enter(self, num: int, label: str) -> None:
+        """Write the node `num`, before the subtrees of its children."""
+
+    @abc.abstractmethod
+    def leave(self, num: int, children: List[int]) -> None:
+        """End the node `num`, whose children were given these numbers."""
+
+    def ref(self, num: int) -> None:
+        """Write a child that is the subtree of the node `num`, shared."""
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+class _DotEmitter(_Emitter):
+    """Writes a node line when a node is entered, its edges when it is left.
+
+    A shared subtree is an edge to the node emitted first, so the graph
+    becomes a DAG.
+    """
+
+    def begin(self) -> None:
+        self.write(textwrap.dedent("""\
         digraph astgraph {
           node [shape=circle, fontsize=12, fontname="Courier", height=.1];
           ranksep=.3;
           edge [arrowsize=.5]
-        """)]
-        self.dot_body = []
-        self.dot_footer = ['}']
+        """))
 
-    def visit_Program(self, node):
-        s = '  node{} [label="Program"]\n'.format(self.ncount)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+    def enter(self, num: int, label: str) -> None:
+        self.write(f'  node{num} [label="{label}"]\n')
 
-        self.visit(node.block)
+    def leave(self, num: int, children: List[int]) -> None:
+        write = self.write
+        for child in children:
+            write(f'  node{num} -> node{child}\n')
 
-        s = '  node{} -> node{}\n'.format(node._num, node.block._num)
-        self.dot_body.append(s)
+    def end(self) -> None:
+        self.write('}')
 
-    def visit_Block(self, node):
-        s = '  node{} [label="Block"]\n'.format(self.ncount)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
 
-        for declaration in node.declarations:
-            self.visit(declaration)
-        self.visit(node.compound_statement)
+class _JsonEmitter(_Emitter):
+    """Writes the tree as nested JSON objects, each with its children.
 
-        for decl_node in node.declarations:
-            s = '  node{} -> node{}\n'.format(node._num, decl_node._num)
-            self.dot_body.append(s)
+    A shared subtree is written once, then as `{"ref": <its id>}`.
+    """
 
-        s = '  node{} -> node{}\n'.format(
-            node._num,
-            node.compound_statement._num
-        )
-        self.dot_body.append(s)
+    def __init__(self, out: IO[str]) -> None:
+        super().__init__(out)
+        # whether the list being written already has an item, per level
+        self.started: List[bool] = [False]
 
-    def visit_VarDecl(self, node):
-        s = '  node{} [label="VarDecl"]\n'.format(self.ncount)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+    def _item(self) -> None:
+        if self.started[-1]:
+            self.write(',')
+        self.started[-1] = True
 
-        self.visit(node.var_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.var_node._num)
-        self.dot_body.append(s)
+    def enter(self, num: int, label: str) -> None:
+        self._item()
+        self.write(f'{{"id":{num},"label":{json.dumps(label)},"children":[')
+        self.started.append(False)
 
-        self.visit(node.type_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.type_node._num)
-        self.dot_body.append(s)
+    def leave(self, num: int, children: List[int]) -> None:
+        self.started.pop()
+        self.write(']}')
 
-    def visit_ProcedureDecl(self, node):
-        s = '  node{} [label="ProcDecl:{}"]\n'.format(
-            self.ncount,
-            node.proc_name
-        )
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+    def ref(self, num: int) -> None:
+        self._item()
+        self.write(f'{{"ref":{num}}}')
 
-        for param_node in node.params:
-            self.visit(param_node)
-            s = '  node{} -> node{}\n'.format(node._num, param_node._num)
-            self.dot_body.append(s)
+    def end(self) -> None:
+        self.write('\n')
 
-        self.visit(node.block_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.block_node._num)
-        self.dot_body.append(s)
 
-    def visit_FunctionDecl(self, node):
-        s = '  node{} [label="FuncDecl:{} => {}"]\n'.format(
-            self.ncount,
-            node.fn_name,
-            node.return_type.value
-        )
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+_EMITTERS: Dict[str, Callable[[IO[str]], _Emitter]] = {
+    'dot': _DotEmitter,
+    'json': _JsonEmitter,
+}
+
 
-        for param_node in node.params:
-            self.visit(param_node)
-            s = '  node{} -> node{}\n'.format(node._num, param_node._num)
-            self.dot_body.append(s)
+class ASTVisualizer(NodeVisitor):
+    """Stream an AST as a DOT graph or as JSON, without touching the tree.
+
+    Every visit_ method gives the label and the children of a node; `emit`
+    numbers the nodes in pre-order and writes them as it goes, so memory
+    does not grow with the output. Options for huge programs:
+
+    max_depth -- the children of nodes this deep are left out, shown `...`
+    max_nodes -- once this many nodes are written, the children still
+                 to come are shown as one `...` node per parent
+    procedure -- only the declaration of the procedure of this name
+    collapse  -- identical subtrees are written once and then shared
+    """
+
+    def __init__(
+        self,
+        tree: AST,
+        max_depth: Optional[int] = None,
+        max_nodes: Optional[int] = None,
+        procedure: Optional[str] = None,
+        collapse: bool = False,
+        format: str = 'dot',
+    ) -> None:
+        if format not in _EMITTERS:
+            raise ValueError(f'Unknown format {format!r}, not one of {FORMATS}')
+        self.tree = tree
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.procedure = procedure
+        self.collapse = collapse
+        self.format = format
+        self.ncount = 0
+        # side tables, keyed by id(node) so the AST is never written to:
+        # the shape of every subtree, interned as a small int, and the
+        # number given to the first subtree of every shape written whole
+        self._shapes: Dict[int, int] = {}
+        self._interned: Dict[Tuple, int] = {}
+        self._emitted: Dict[int, int] = {}
+        # number of subtrees cut by max_depth or max_nodes so far
+        self._cuts = 0
 
-        self.visit(node.block_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.block_node._num)
-        self.dot_body.append(s)
+    def visit_Program(self, node):
+        return 'Program', [node.block]
 
-    def visit_Param(self, node):
-        s = '  node{} [label="Param"]\n'.format(self.ncount)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+    def visit_Block(self, node):
+        return 'Block', [*node.declarations, node.compound_statement]
+
+    def visit_VarDecl(self, node):
+        return 'VarDecl', [node.var_node, node.type_node]
 
-        self.visit(node.var_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.var_node._num)
-        self.dot_body.append(s)
+    def visit_ProcedureDecl(self, node):
+        return f'ProcDecl:{node.proc_name}', [*node.params, node.block_node]
 
-        self.visit(node.type_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.type_node._num)
-        self.dot_body.append(s)
+    def visit_FunctionDecl(self, node):
+        label = f'FuncDecl:{node.fn_name} => {node.return_type.value}'
+        return label, [*node.params, node.block_node]
 
+    def visit_Param(self, node):
+        return 'Param', [node.var_node, node.type_node]
 
     def visit_Type(self, node):
-        s = '  node{} [label="{}"]\n'.format(self.ncount, node.token.value)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+        return f'{node.value}', []
 
     def visit_Num(self, node):
-        s = '  node{} [label="{}"]\n'.format(self.ncount, node.token.value)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+        return f'{node.value}', []
 
     def visit_BinOp(self, node):
-        s = '  node{} [label="{}"]\n'.format(self.ncount, node.op.value)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
-
-        self.visit(node.left)
-        self.visit(node.right)
-
-        for child_node in (node.left, node.right):
-            s = '  node{} -> node{}\n'.format(node._num, child_node._num)
-            self.dot_body.append(s)
+        return f'{node.op.value}', [node.left, node.right]
 
     def visit_UnaryOp(self, node):
-        s = '  node{} [label="unary {}"]\n'.format(self.ncount, node.op.value)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
-
-        self.visit(node.expr)
-        s = '  node{} -> node{}\n'.format(node._num, node.expr._num)
-        self.dot_body.append(s)
+        return f'unary {node.op.value}', [node.expr]
 
     def visit_Compound(self, node):
-        s = '  node{} [label="Compound"]\n'.format(self.ncount)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
-
-        for child in node.children:
-            self.visit(child)
-            s = '  node{} -> node{}\n'.format(node._num, child._num)
-            self.dot_body.append(s)
+        return 'Compound', node.children
 
     def visit_Assign(self, node):
-        s = '  node{} [label="{}"]\n'.format(self.ncount, node.op.value)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
-
-        self.visit(node.left)
-        self.visit(node.right)
-
-        for child_node in (node.left, node.right):
-            s = '  node{} -> node{}\n'.format(node._num, child_node._num)
-            self.dot_body.append(s)
+        return f'{node.op.value}', [node.left, node.right]
 
     def visit_Var(self, node):
-        s = '  node{} [label="{}"]\n'.format(self.ncount, node.value)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+        return f'{node.value}', []
 
     def visit_NoOp(self, node):
-        s = '  node{} [label="NoOp"]\n'.format(self.ncount)
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
+        return 'NoOp', []
 
     def visit_ProcedureCall(self, node):
-        s = '  node{} [label="ProcCall:{}"]\n'.format(
-            self.ncount,
-            node.proc_name
-        )
-        self.dot_body.append(s)
-        node._num = self.ncount
-        self.ncount += 1
-
-        for param_node in node.actual_params:
-            self.visit(param_node)
-            s = '  node{} -> node{}\n'.format(node._num, param_node._num)
-            self.dot_body.append(s)
+        return f'ProcCall:{node.proc_name}', node.actual_params
+
+    def find_procedure(self, node: AST, name: str) -> Optional[AST]:
+        """The declaration of the procedure `name` under `node`, depth
+        first."""
+        for child in self.visit(node)[1]:
+            if isinstance(child, (ProcedureDecl, FunctionDecl)):
+                child_name = (
+                    child.proc_name if isinstance(child, ProcedureDecl)
+                    else child.fn_name
+                )
+                if child_name.upper() == name.upper():
+                    return child
+            if isinstance(child, (Program, Block, ProcedureDecl,
+                                  FunctionDecl)):
+                found = self.find_procedure(child, name)
+                if found is not None:
+                    return found
+        return None
+
+    def shape(self, node: AST) -> int:
+        """Interned shape of the subtree under `node`, for `collapse`."""
+        label, children = self.visit(node)
+        key = (label, *[self.shape(child) for child in children])
+        shape = self._interned.setdefault(key, len(self._interned))
+        self._shapes[id(node)] = shape
+        return shape
+
+    def emit(self, emitter: _Emitter, node: AST, depth: int) -> int:
+        """Write the subtree under `node`, return the number of its root.
+
+        With `collapse`, a subtree is only shared once it is written whole:
+        one cut by max_depth or max_nodes stands for itself alone.
+        """
+        label, children = self.visit(node)
+
+        if children and self.collapse:
+            shape = self._shapes[id(node)]
+            num = self._emitted.get(shape)
+            if num is not None:
+                emitter.ref(num)
+                return num
 
-    def gendot(self):
-        tree = self.tree
-        self.visit(tree)
-        return ''.join(self.dot_header + self.dot_body + self.dot_footer)
\ No newline at end of file
+        self.ncount += 1
+        num = self.ncount
+        cuts = self._cuts
+        if children and self.max_depth is not None and depth >= self.max_depth:
+            label = f'{label} ...'
+            children = []
+            self._cuts += 1
+
+        emitter.enter(num, label)
+        nums = []
+        for child in children:
+            if self.max_nodes is not None and self.ncount >= self.max_nodes:
+                # one placeholder for all the children left out
+                self.ncount += 1
+                self._cuts += 1
+                nums.append(self.ncount)
+                emitter.enter(self.ncount, '...')
+                emitter.leave(self.ncount, [])
+                break
+            nums.append(self.emit(emitter, child, depth + 1))
+        emitter.leave(num, nums)
+
+        if children and self.collapse and self._cuts == cuts:
+            self._emitted[shape] = num
+        return num
+
+    def root(self) -> AST:
+        """The node to write: the tree, or the declaration of `procedure`."""
+        if self.procedure is None:
+            return self.tree
+        root = self.find_procedure(self.tree, self.procedure)
+        if root is None:
+            raise ValueError(f'No procedure {self.procedure!r}')
+        return root
+
+    def write(self, out: IO[str], root: Optional[AST] = None) -> None:
+        """Write the tree to the text file `out` while visiting it."""
+        if root is None:
+            root = self.root()
+        if self.collapse:
+            self.shape(root)
+
+        emitter = _EMITTERS[self.format](out)
+        emitter.begin()
+        self.emit(emitter, root, 0)
+        emitter.end()
+
+    def gendot(self) -> str:
+        out = io.StringIO()
+        self.write(out)
+        return out.getvalue()
@@ -0,0 +1,134 @@
+import time
+
+from collections import Counter
+from typing import Any, Dict, List
+
+from core.visitors.pascal import Interpreter
+
+
+class ProcedureProfile(object):
+    """Calls and time of one procedure, or of the main program."""
+    __slots__ = ('name', 'calls', 'inclusive', 'exclusive', 'max_depth',
+                 'active')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        # seconds spent in the procedure, with and without its callees
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        # deepest call stack the procedure was called with
+        self.max_depth = 0
+        # activations on the call stack, so a recursive procedure only adds
+        # the time of its outermost one to `inclusive`
+        self.active = 0
+
+
+class CallProfile(object):
+    """Profile of a run: procedures, call stacks and AST nodes evaluated.
+
+    Procedures are keyed by their ProcedureSymbol, so two procedures of
+    the same name declared in different scopes are told apart. Stacks are
+    the procedure names from the program down, and hold the exclusive time
+    spent in them.
+    """
+
+    def __init__(self) -> None:
+        self.procedures: Dict[Any, ProcedureProfile] = {}
+        self.stacks: Counter = Counter()
+        self.nodes: Counter = Counter()
+        # [profile, stack, start, time spent in callees]
+        self._frames: List[list] = []
+
+    def enter(self, key: Any, name: str, depth: int) -> None:
+        profile = self.procedures.get(key)
+        if profile is None:
+            profile = self.procedures[key] = ProcedureProfile(name)
+        profile.calls += 1
+        profile.active += 1
+        if depth > profile.max_depth:
+            profile.max_depth = depth
+        stack = f'{self._frames[-1][1]};{name}' if self._frames else name
+        self._frames.append([profile, stack, time.perf_counter(), 0.0])
+
+    def leave(self) -> None:
+        profile, stack, start, callees = self._frames.pop()
+        elapsed = time.perf_counter() - start
+        profile.active -= 1
+        if not profile.active:
+            profile.inclusive += elapsed
+        profile.exclusive += elapsed - callees
+        self.stacks[stack] += elapsed - callees
+        if self._frames:
+            self._frames[-1][3] += elapsed
+
+    def table(self) -> str:
+        """Procedures by exclusive time, then AST nodes by evaluations."""
+        row = '{:<20} {:>10} {:>14} {:>14} {:>10}'
+        lines = [row.format(
+            'procedure', 'calls', 'inclusive (ms)', 'exclusive (ms)',
+            'max depth',
+        )]
+        lines.append('-' * len(lines[0]))
+        profiles = sorted(
+            self.procedures.values(), key=lambda p: p.exclusive, reverse=True
+        )
+        for p in profiles:
+            lines.append(row.format(
+                p.name, f'{p.calls:,}', f'{p.inclusive * 1e3:.3f}',
+                f'{p.exclusive * 1e3:.3f}', p.max_depth,
+            ))
+
+        lines.append('')
+        lines.append('{:<20} {:>10}'.format('node', 'evaluated'))
+        lines.append('-' * 31)
+        for node_class, count in self.nodes.most_common():
+            lines.append(f'{node_class.__name__:<20} {count:>10,}')
+        return '\n'.join(lines)
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format of flamegraph.pl and speedscope.
+
+        One line per call stack: the procedure names separated by `;`,
+        then the microseconds spent in the innermost one.
+        """
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            microseconds = round(seconds * 1e6)
+            if microseconds:
+                lines.append(f'{stack} {microseconds}')
+        return ''.join(f'{line}\n' for line in lines)
+
+
+class ProfilingInterpreter(Interpreter):
+    """Interpreter that fills a CallProfile while it runs the program.
+
+    Timing every call and counting every visit slows the program down, so
+    the times are only comparable with each other.
+    """
+
+    def __init__(self, tree, trace=None):
+        super().__init__(tree, trace)
+        self.profile = CallProfile()
+
+    def visit(self, node):
+        self.profile.nodes[type(node)] += 1
+        return super().visit(node)
+
+    def call_procedure(self, proc_symbol):
+        self.profile.enter(
+            proc_symbol, proc_symbol.name, self.call_stack.stack_size()
+        )
+        try:
+            super().call_procedure(proc_symbol)
+        finally:
+            self.profile.leave()
+
+    def interpret(self):
+        if self.tree is None:
+            return ''
+        self.profile.enter(self.tree, self.tree.name, 1)
+        try:
+            return super().interpret()
+        finally:
+            self.profile.leave()
@@ -0,0 +1,231 @@
+import gc
+
+from core.visitors.node_visitor import NodeVisitor
+from core.visitors.pascal import Interpreter
+from core.token import TokenType
+from core.activation_record import ActivationRecord, ARType
+
+
+def _noop():
+    pass
+
+
+class ClosureCompiler(NodeVisitor):
+    """Compile a semantically checked AST into nested Python closures.
+
+    Every visit_* method returns a closure that takes no arguments and
+    evaluates its node, with operators already resolved and children
+    already compiled. The closures run against the call stack of the
+    interpreter they are compiled for, with the same activation records
+    as the tree-walking Interpreter.
+    """
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        # procedure body (Block node) -> compiled closure; filled in as the
+        # declarations are compiled and read when a call is executed, so
+        # calls may refer to procedures that are still being compiled
+        self.bodies = {}
+
+    def compile(self, tree):
+        return self.visit(tree)
+
+    def visit_Assign(self, node):
+        stack_elems = self.interpreter.call_stack.elems
+        depth = node.left.depth
+        slot = node.left.slot
+        right = self.visit(node.right)
+
+        if depth == 0:
+            def assign():
+                stack_elems[-1].locals[slot] = right()
+        else:
+            def assign():
+                stack_elems[-1].enclosing(depth).locals[slot] = right()
+        return assign
+
+    def visit_BinOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        op = node.token_type
+        if op == TokenType.PLUS:
+            return lambda: left() + right()
+        elif op == TokenType.MINUS:
+            return lambda: left() - right()
+        elif op == TokenType.INTEGER_DIV:
+            return lambda: left() // right()
+        elif op == TokenType.FLOAT_DIV:
+            return lambda: float(left()) / float(right())
+        elif op == TokenType.MUL:
+            return lambda: left() * right()
+        return _noop
+
+    def visit_Block(self, node):
+        for declaration in node.declarations:
+            self.visit(declaration)
+        return self.visit(node.compound_statement)
+
+    def visit_Compound(self, node):
+        children = tuple(
+            child for child in map(self.visit, node.children)
+            if child is not _noop
+        )
+
+        def compound():
+            for child in children:
+                child()
+        return compound
+
+    def visit_FunctionDecl(self, node):
+        return _noop
+
+    def visit_NoOp(self, node):
+        return _noop
+
+    def visit_Num(self, node):
+        value = node.value
+        return lambda: value
+
+    def visit_ProcedureCall(self, node):
+        interpreter = self.interpreter
+        call_stack = interpreter.call_stack
+        log = interpreter.log
+        trace = log.enabled
+        bodies = self.bodies
+
+        proc_name = node.proc_name
+        proc_symbol = node.proc_symbol
+        block = proc_symbol.block_ast
+        scope_level = proc_symbol.scope_level
+        nesting_level = scope_level + 1
+        slot_names = block.slot_names
+        formal_slots = [param.slot for param in proc_symbol.formal_params]
+        params = list(zip(formal_slots, map(self.visit, node.actual_params)))
+
+        def procedure_call():
+            caller = call_stack.elems[-1]
+            ar = ActivationRecord(
+                proc_name,
+                ARType.PROCEDURE,
+                nesting_level=nesting_level,
+                slot_names=slot_names,
+                static_link=caller.enclosing(
+                    caller.nesting_level - scope_level
+                )
+            )
+            local_values = ar.locals
+            for slot, param in params:
+                local_values[slot] = param()
+
+            call_stack.push(ar)
+
+            if trace:
+                log(f'ENTER: PROCEDURE {proc_name}')
+                log(str(call_stack))
+
+            bodies[block]()
+
+            if trace:
+                log(f'LEAVE: PROCEDURE {proc_name}')
+                log(str(call_stack))
+
+            call_stack.pop()
+        return procedure_call
+
+    def visit_ProcedureDecl(self, node):
+        self.bodies[node.block_node] = self.visit(node.block_node)
+        return _noop
+
+    def visit_Program(self, node):
+        interpreter = self.interpreter
+        call_stack = interpreter.call_stack
+        log = interpreter.log
+        trace = log.enabled
+
+        prog_name = node.name
+        slot_names = node.block.slot_names
+        block = self.visit(node.block)
+
+        def program():
+            log(f'ENTER: PROGRAM {prog_name}')
+
+            ar = ActivationRecord(
+                name=prog_name,
+                type=ARType.PROGRAM,
+                nesting_level=1,
+                slot_names=slot_names,
+            )
+            call_stack.push(ar)
+
+            if trace:
+                log(str(call_stack))
+
+            block()
+
+            if trace:
+                log(f'LEAVE: PROGRAM {prog_name}')
+                log(str(call_stack))
+
+            call_stack.pop()
+            return dict(ar.items())
+        return program
+
+    def visit_Type(self, node):
+        return _noop
+
+    def visit_UnaryOp(self, node):
+        expr = self.visit(node.expr)
+
+        if node.token_type == TokenType.PLUS:
+            return lambda: +expr()
+        elif node.token_type == TokenType.MINUS:
+            return lambda: -expr()
+        return _noop
+
+    def visit_Var(self, node):
+        stack_elems = self.interpreter.call_stack.elems
+        var_name = node.value
+        depth = node.depth
+        slot = node.slot
+
+        # locals of the current record are read directly, outer variables
+        # through the static links
+        if depth == 0:
+            def var():
+                val = stack_elems[-1].locals[slot]
+                if val is None:
+                    raise NameError(repr(var_name))
+                return val
+        else:
+            def var():
+                val = stack_elems[-1].enclosing(depth).locals[slot]
+                if val is None:
+                    raise NameError(repr(var_name))
+                return val
+        return var
+
+    def visit_VarDecl(self, node):
+        return _noop
+
+
+class ClosureInterpreter(Interpreter):
+    """Interpreter that compiles the tree into closures once, then runs it."""
+    def __init__(self, tree, trace=None):
+        super().__init__(tree, trace)
+        self.code = None
+
+    def interpret(self):
+        tree = self.tree
+        if tree is None:
+            return ''
+        if self.code is None:
+            # compiling allocates a closure per node, which would otherwise
+            # trigger many collections over the whole (acyclic) tree
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                self.code = ClosureCompiler(self).compile(tree)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+        return self.code()
@@ -1,8 +1,29 @@
+from typing import Any, Callable, Dict
+
+
 class NodeVisitor(object):
+    # node class -> visit method, filled in on first use. Every visitor
+    # class gets its own table (see __init_subclass__), so the f-string
+    # name building and getattr lookup happen once per node class.
+    _dispatch: Dict[type, Callable[[Any, Any], Any]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
     def visit(self, node):
-        method_name = f'visit_{type(node).__name__}'
-        visitor = getattr(self, method_name, self.undefined_visit)
-        return visitor(node)
+        try:
+            visitor = self._dispatch[type(node)]
+        except KeyError:
+            visitor = self._resolve_visit(type(node))
+        return visitor(self, node)
+
+    @classmethod
+    def _resolve_visit(cls, node_class: type) -> Callable[[Any, Any], Any]:
+        method_name = f'visit_{node_class.__name__}'
+        visitor = getattr(cls, method_name, cls.undefined_visit)
+        cls._dispatch[node_class] = visitor
+        return visitor
 
     def undefined_visit(self, node):
-        raise Exception(f'No visit_{type(node).__name__} method')
\ No newline at end of file
+        raise Exception(f'No visit_{type(node).__name__} method')
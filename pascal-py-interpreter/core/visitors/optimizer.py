@@ -0,0 +1,152 @@
+from collections import Counter
+from typing import List, Union
+
+from core.ast import *
+from core.token import Token, TokenType
+from core.visitors.node_visitor import NodeVisitor
+
+
+Expr = Union[UnaryOp, Num, Var, BinOp]
+Statement = Union[NoOp, Compound, ProcedureCall, Assign]
+
+_FOLDERS = {
+    TokenType.PLUS: lambda left, right: left + right,
+    TokenType.MINUS: lambda left, right: left - right,
+    TokenType.MUL: lambda left, right: left * right,
+    TokenType.INTEGER_DIV: lambda left, right: left // right,
+    TokenType.FLOAT_DIV: lambda left, right: float(left) / float(right),
+}
+
+
+def _is_int(node: Expr, value: int) -> bool:
+    # only INTEGER literals are identities: `X * 1.0` turns an INTEGER
+    # X into a REAL, so it is kept
+    return isinstance(node, Num) and type(node.value) is int and \
+        node.value == value
+
+
+class ConstantFolder(NodeVisitor):
+    """Optimization pass over a semantically checked AST.
+
+    Folds BinOp and UnaryOp subtrees with literal operands into a Num,
+    evaluated with the same operators as the Interpreter so DIV and /
+    keep their INTEGER and REAL results, simplifies the identities
+    X * 1, 1 * X, X + 0, 0 + X, X - 0 and unary plus, and drops NoOp
+    statements. Expressions are rewritten in place and `stats` counts
+    the nodes eliminated by every kind of rewrite.
+    """
+    def __init__(self) -> None:
+        self.stats: Counter = Counter()
+
+    @property
+    def eliminated(self) -> int:
+        return sum(self.stats.values())
+
+    def optimize(self, tree: Program) -> Program:
+        self.visit(tree)
+        return tree
+
+    def report(self) -> str:
+        lines = [f'{self.eliminated} AST nodes eliminated']
+        for kind, count in sorted(self.stats.items()):
+            lines.append(f'  {kind:<12}: {count}')
+        return '\n'.join(lines)
+
+    def fold(self, node: TokenNode, value: Union[int, float]) -> Num:
+        token_type = (
+            TokenType.INTEGER_CONST if type(value) is int
+            else TokenType.REAL_CONST
+        )
+        token = Token(
+            token_type, value, lineno=node.lineno, column=node.column
+        )
+        return Num(token, keep_token=node._token is not None)
+
+    def visit_Program(self, node: Program) -> None:
+        self.visit(node.block)
+
+    def visit_Block(self, node: Block) -> None:
+        for declaration in node.declarations:
+            self.visit(declaration)
+        self.visit(node.compound_statement)
+
+    def visit_VarDecl(self, node: VarDecl) -> None:
+        pass
+
+    def visit_ProcedureDecl(self, node: ProcedureDecl) -> None:
+        self.visit(node.block_node)
+
+    def visit_FunctionDecl(self, node: FunctionDecl) -> None:
+        self.visit(node.block_node)
+
+    def visit_Compound(self, node: Compound) -> None:
+        children: List[Statement] = []
+        for child in node.children:
+            if isinstance(child, NoOp):
+                self.stats['noop'] += 1
+                continue
+            self.visit(child)
+            children.append(child)
+        node.children = children
+
+    def visit_NoOp(self, node: NoOp) -> None:
+        pass
+
+    def visit_Assign(self, node: Assign) -> None:
+        node.right = self.visit(node.right)
+
+    def visit_ProcedureCall(self, node: ProcedureCall) -> None:
+        node.actual_params = [
+            self.visit(param) for param in node.actual_params
+        ]
+
+    def visit_BinOp(self, node: BinOp) -> Expr:
+        left = node.left = self.visit(node.left)
+        right = node.right = self.visit(node.right)
+        op = node.token_type
+
+        if isinstance(left, Num) and isinstance(right, Num):
+            try:
+                value = _FOLDERS[op](left.value, right.value)
+            except ZeroDivisionError:
+                # left for the program to fail when it runs
+                return node
+            self.stats['folded'] += 2
+            return self.fold(node, value)
+
+        if op == TokenType.MUL:
+            if _is_int(right, 1):
+                self.stats['simplified'] += 2
+                return left
+            if _is_int(left, 1):
+                self.stats['simplified'] += 2
+                return right
+        elif op == TokenType.PLUS:
+            if _is_int(right, 0):
+                self.stats['simplified'] += 2
+                return left
+            if _is_int(left, 0):
+                self.stats['simplified'] += 2
+                return right
+        elif op == TokenType.MINUS:
+            if _is_int(right, 0):
+                self.stats['simplified'] += 2
+                return left
+        return node
+
+    def visit_UnaryOp(self, node: UnaryOp) -> Expr:
+        expr = node.expr = self.visit(node.expr)
+
+        if node.token_type == TokenType.PLUS:
+            self.stats['simplified'] += 1
+            return expr
+        if isinstance(expr, Num) and isinstance(expr.value, (int, float)):
+            self.stats['folded'] += 1
+            return self.fold(node, -expr.value)
+        return node
+
+    def visit_Num(self, node: Num) -> Num:
+        return node
+
+    def visit_Var(self, node: Var) -> Var:
+        return node
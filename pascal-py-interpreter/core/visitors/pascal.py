@@ -1,38 +1,35 @@
-import os
-
+from core import tracing
 from core.visitors.node_visitor import NodeVisitor
 from core.token import TokenType
 from core.stack import Stack
 from core.activation_record import ActivationRecord, ARType
 
-_SHOULD_LOG_STACK = os.environ['_SHOULD_LOG_STACK']
-
 class Interpreter(NodeVisitor):
-    def __init__(self, tree):
+    def __init__(self, tree, trace=None):
         self.tree = tree
         self.call_stack = Stack()
-
-    def log(self, msg):
-        if _SHOULD_LOG_STACK:
-            print(f'⓸ Interpreter | {msg}')
+        self.log = tracing.tracer(tracing.STACK, '⓸ Interpreter | ', trace)
 
     def visit_Assign(self, node):
         ar = self.call_stack.peek()
-        var_name = node.left.value
+        var_node = node.left
         var_value = self.visit(node.right)
 
-        ar[var_name] = var_value
+        if var_node.slot is None:
+            ar[var_node.value] = var_value
+        else:
+            ar.enclosing(var_node.depth).locals[var_node.slot] = var_value
 
     def visit_BinOp(self, node):
-        if node.op.type == TokenType.PLUS:
+        if node.token_type == TokenType.PLUS:
             return self.visit(node.left) + self.visit(node.right)
-        elif node.op.type == TokenType.MINUS:
+        elif node.token_type == TokenType.MINUS:
             return self.visit(node.left) - self.visit(node.right)
-        elif node.op.type == TokenType.INTEGER_DIV:
+        elif node.token_type == TokenType.INTEGER_DIV:
             return self.visit(node.left) // self.visit(node.right)
-        elif node.op.type == TokenType.FLOAT_DIV:
+        elif node.token_type == TokenType.FLOAT_DIV:
             return float(self.visit(node.left)) / float(self.visit(node.right))
-        elif node.op.type == TokenType.MUL:
+        elif node.token_type == TokenType.MUL:
             return self.visit(node.left) * self.visit(node.right)
 
     def visit_Block(self, node):
@@ -55,29 +52,43 @@ class Interpreter(NodeVisitor):
 
     def visit_ProcedureCall(self, node):
         proc_name = node.proc_name
-        formal_params = node.proc_symbol.formal_params
+        proc_symbol = node.proc_symbol
+        formal_params = proc_symbol.formal_params
         actual_params = node.actual_params
 
+        # the static link points to the record of the scope the procedure
+        # is declared in, found from the caller's one
+        caller = self.call_stack.peek()
         ar = ActivationRecord(
             proc_name,
             ARType.PROCEDURE,
-            nesting_level=node.proc_symbol.scope_level + 1
+            nesting_level=proc_symbol.scope_level + 1,
+            slot_names=proc_symbol.block_ast.slot_names,
+            static_link=caller.enclosing(
+                caller.nesting_level - proc_symbol.scope_level
+            )
         )
         for f_p, a_p in zip(formal_params, actual_params):
-            ar[f_p.name] = self.visit(a_p)
+            ar.locals[f_p.slot] = self.visit(a_p)
 
         self.call_stack.push(ar)
 
-        self.log(f'ENTER: PROCEDURE {proc_name}')
-        self.log(str(self.call_stack))
+        if self.log.enabled:
+            self.log(f'ENTER: PROCEDURE {proc_name}')
+            self.log(str(self.call_stack))
 
-        self.visit(node.proc_symbol.block_ast)
+        self.call_procedure(proc_symbol)
 
-        self.log(f'LEAVE: PROCEDURE {proc_name}')
-        self.log(str(self.call_stack))
+        if self.log.enabled:
+            self.log(f'LEAVE: PROCEDURE {proc_name}')
+            self.log(str(self.call_stack))
 
         self.call_stack.pop()
 
+    def call_procedure(self, proc_symbol):
+        # runs the body of a procedure, its activation record on top of the
+        # call stack; the hook of the ProfilingInterpreter
+        self.visit(proc_symbol.block_ast)
 
     def visit_ProcedureDecl(self, node):
         pass
@@ -90,36 +101,48 @@ class Interpreter(NodeVisitor):
             name=prog_name,
             type=ARType.PROGRAM,
             nesting_level=1,
+            slot_names=node.block.slot_names,
         )
         self.call_stack.push(ar)
 
-        self.log(str(self.call_stack))
+        if self.log.enabled:
+            self.log(str(self.call_stack))
 
         self.visit(node.block)
 
-        self.log(f'LEAVE: PROGRAM {prog_name}')
-        self.log(str(self.call_stack))
+        if self.log.enabled:
+            self.log(f'LEAVE: PROGRAM {prog_name}')
+            self.log(str(self.call_stack))
 
         self.call_stack.pop()
+        # the global variables the program ends with
+        return dict(ar.items())
 
     def visit_Type(self, node):
         # Do nothing
         pass
 
     def visit_UnaryOp(self, node):
-        if node.op.type == TokenType.PLUS:
+        if node.token_type == TokenType.PLUS:
             return +self.visit(node.expr)
-        elif node.op.type == TokenType.MINUS:
+        elif node.token_type == TokenType.MINUS:
             return -self.visit(node.expr)
 
     def visit_Var(self, node):
-        for sp in range(self.call_stack.stack_size()):
-            ar = self.call_stack.peek(level=-sp)
-            var_name = node.value
-            val = ar.get(var_name)
-
-            if val != None:
-                break;
+        if node.slot is None:
+            # not resolved by the SemanticAnalyzer: search the call stack,
+            # innermost record first
+            val = None
+            for sp in range(1, self.call_stack.stack_size() + 1):
+                val = self.call_stack.peek(level=-sp).get(node.value)
+
+                if val is not None:
+                    break
+        else:
+            ar = self.call_stack.peek()
+            for _ in range(node.depth):
+                ar = ar.static_link
+            val = ar.locals[node.slot]
 
         if val is None:
             raise NameError(repr(node.value))
@@ -0,0 +1,236 @@
+from typing import Any, Dict, List, Optional, Set
+
+from core import tracing
+from core.ast import *
+from core.symbol import (
+    ScopedSymbolTable, VarSymbol, ProcedureSymbol, FunctionSymbol
+)
+from core.token import TokenType
+from core.visitors.node_visitor import NodeVisitor
+
+_PYTHON_TYPES = {'INTEGER': 'int', 'REAL': 'float'}
+
+# Binding power of the expressions, which is the same in Pascal and Python
+# for the operators of the subset; atoms (numbers and variables) bind
+# tightest.
+_ADDITIVE, _MULTIPLICATIVE, _UNARY, _ATOM = range(4)
+_PRECEDENCE = {
+    TokenType.PLUS:        _ADDITIVE,
+    TokenType.MINUS:       _ADDITIVE,
+    TokenType.MUL:         _MULTIPLICATIVE,
+    TokenType.INTEGER_DIV: _MULTIPLICATIVE,
+    TokenType.FLOAT_DIV:   _MULTIPLICATIVE,
+}
+
+
+def _precedence(node: AST) -> int:
+    if isinstance(node, BinOp):
+        return _PRECEDENCE[node.token_type]
+    if isinstance(node, UnaryOp):
+        return _UNARY
+    return _ATOM
+
+
+class PythonCodegen(NodeVisitor):
+    """Lower a semantically checked Program AST into Python source.
+
+    The program becomes a `_main` function and every procedure or function
+    a nested `def`, so Pascal scopes map onto Python closures. Variable
+    declarations become bare annotations (`X: int`): reading a variable
+    before it is assigned raises a NameError, as in the Interpreter.
+    Assignments to variables of an enclosing scope, found through the
+    ScopedSymbolTable levels, are declared `nonlocal`. The module leaves the
+    final locals of `_main` in `_frame`. Expressions are only parenthesized
+    where the precedence of the operators needs it: Python rejects more
+    than 200 nested parentheses, which a long Pascal expression reaches.
+    """
+    def __init__(self, trace: bool = False) -> None:
+        self.trace = trace
+        self.current_scope: ScopedSymbolTable
+        self.lines: List[str] = []
+        self.indent = 0
+        # names assigned in enclosing scopes, for every function being built
+        self.nonlocals: List[Set[str]] = []
+
+    def generate(self, tree: Program) -> str:
+        self.visit(tree)
+        return '\n'.join(self.lines) + '\n'
+
+    def emit(self, line: str) -> None:
+        self.lines.append('    ' * self.indent + line)
+
+    def emit_function(
+        self,
+        name: str,
+        params: List[Param],
+        block_node: Block,
+        kind: str,
+        label: str,
+        result: Optional[str] = None
+    ) -> None:
+        """Emit a `def` for a procedure, a function or the main program.
+
+        `kind` and `label` name the function in the trace, e.g. PROCEDURE
+        ALPHA, and `result` is the expression it returns, if any.
+        """
+        # the body is generated first: its `nonlocal` declaration has to
+        # come before every statement that uses the names
+        outer_lines = self.lines
+        self.lines = []
+        self.nonlocals.append(set())
+        self.indent += 1
+
+        if self.trace:
+            self.emit(f"_log('ENTER: {kind} {label}')")
+        self.visit(block_node)
+        if self.trace:
+            self.emit(f"_log('LEAVE: {kind} {label}')")
+        if result is not None:
+            self.emit(f'return {result}')
+
+        body = self.lines
+        nonlocals = self.nonlocals.pop()
+        self.lines = outer_lines
+
+        self.indent -= 1
+        param_names = ', '.join(param.var_node.value for param in params)
+        self.emit(f'def {name}({param_names}):')
+        self.indent += 1
+        if nonlocals:
+            self.emit(f'nonlocal {", ".join(sorted(nonlocals))}')
+        if not body:
+            self.emit('pass')
+        self.lines.extend(body)
+        self.indent -= 1
+
+    def enter_scope(self, name: str, params: List[Param]) -> None:
+        self.current_scope = ScopedSymbolTable(
+            name=name,
+            level=self.current_scope.scope_level + 1,
+            enclosing_scope=self.current_scope
+        )
+        for param in params:
+            param_type = self.current_scope.lookup(param.type_node.value)
+            self.current_scope.define(
+                VarSymbol(param.var_node.value, param_type)
+            )
+
+    def visit_Program(self, node: Program) -> None:
+        self.current_scope = ScopedSymbolTable(
+            name='global', level=1,
+            enclosing_scope=None
+        )
+        self.emit_function(
+            '_main', [], node.block, 'PROGRAM', node.name, result='locals()'
+        )
+        self.emit('_frame = _main()')
+
+    def visit_Block(self, node: Block) -> None:
+        for declaration in node.declarations:
+            self.visit(declaration)
+        self.visit(node.compound_statement)
+
+    def visit_VarDecl(self, node: VarDecl) -> None:
+        type_name = node.type_node.value
+        var_name = node.var_node.value
+        self.current_scope.define(
+            VarSymbol(var_name, self.current_scope.lookup(type_name))
+        )
+        self.emit(f'{var_name}: {_PYTHON_TYPES.get(type_name, "object")}')
+
+    def visit_ProcedureDecl(self, node: ProcedureDecl) -> None:
+        proc_name = node.proc_name
+        self.current_scope.define(ProcedureSymbol(proc_name))
+
+        self.enter_scope(proc_name, node.params)
+        self.emit_function(
+            proc_name, node.params, node.block_node, 'PROCEDURE', proc_name
+        )
+        self.current_scope = self.current_scope.enclosing_scope
+
+    def visit_FunctionDecl(self, node: FunctionDecl) -> None:
+        fn_name = node.fn_name
+        self.current_scope.define(FunctionSymbol(fn_name, node.return_type))
+
+        self.enter_scope(fn_name, node.params)
+        # the result is returned through a local named after the function
+        self.current_scope.define(VarSymbol(fn_name, node.return_type))
+        self.emit_function(
+            fn_name, node.params, node.block_node, 'FUNCTION', fn_name,
+            result=fn_name
+        )
+        self.current_scope = self.current_scope.enclosing_scope
+
+    def visit_Compound(self, node: Compound) -> None:
+        for child in node.children:
+            self.visit(child)
+
+    def visit_NoOp(self, node: NoOp) -> None:
+        pass
+
+    def visit_Assign(self, node: Assign) -> None:
+        var_name = node.left.value
+        var_symbol, level = self.current_scope.lookup(var_name, with_scope=True)
+        if (isinstance(var_symbol, VarSymbol) and
+            level < self.current_scope.scope_level
+        ):
+            self.nonlocals[-1].add(var_name)
+
+        self.emit(f'{var_name} = {self.visit(node.right)}')
+
+    def visit_ProcedureCall(self, node: ProcedureCall) -> None:
+        args = ', '.join(self.visit(param) for param in node.actual_params)
+        self.emit(f'{node.proc_name}({args})')
+
+    def operand(self, node: AST, precedence: int) -> str:
+        """The source of `node`, parenthesized if it binds looser than
+        `precedence`."""
+        source = self.visit(node)
+        if _precedence(node) < precedence:
+            return f'({source})'
+        return source
+
+    def visit_BinOp(self, node: BinOp) -> str:
+        if node.token_type == TokenType.FLOAT_DIV:
+            # the operands are arguments of float(), whatever they are
+            left = self.visit(node.left)
+            right = self.visit(node.right)
+            return f'float({left}) / float({right})'
+
+        precedence = _PRECEDENCE[node.token_type]
+        # operators are left associative: a right operand of the same
+        # precedence keeps its parentheses, as in a - (b - c)
+        left = self.operand(node.left, precedence)
+        right = self.operand(node.right, precedence + 1)
+        if node.token_type == TokenType.INTEGER_DIV:
+            return f'{left} // {right}'
+        return f'{left} {node.token_type.value} {right}'
+
+    def visit_UnaryOp(self, node: UnaryOp) -> str:
+        expr = self.operand(node.expr, _UNARY)
+        return f'{node.token_type.value}{expr}'
+
+    def visit_Num(self, node: Num) -> str:
+        return repr(node.value)
+
+    def visit_Var(self, node: Var) -> str:
+        return node.value
+
+
+class PythonInterpreter(object):
+    """Run a program as a Python module, compiled once with compile()."""
+    def __init__(self, tree, trace=None):
+        self.tree = tree
+        self.log = tracing.tracer(tracing.STACK, '⓸ Python | ', trace)
+        self.source = PythonCodegen(trace=self.log.enabled).generate(tree)
+        self.code = compile(self.source, f'<pascal {tree.name}>', 'exec')
+
+    def interpret(self) -> Dict[str, Any]:
+        namespace = {'_log': self.log}
+        exec(self.code, namespace)
+        # locals() also holds the procedures; keep the assigned variables
+        frame = namespace['_frame']
+        return {
+            name: frame[name]
+            for name in self.tree.block.slot_names if name in frame
+        }
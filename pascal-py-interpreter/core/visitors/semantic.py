@@ -1,33 +1,59 @@
-import ast
-import os
+from typing import Callable, List, Set
 
+from core import tracing
 from core.ast import *
 from core.errors.semantic import SemanticError
 from core.errors.generic import ErrorCode
 from core.symbol import (
-    ScopedSymbolTable, VarSymbol, ProcedureSymbol, FunctionSymbol
+    FlatSymbolTable, ScopedSymbolTable, Symbol, VarSymbol, ProcedureSymbol,
+    FunctionSymbol
 )
 from core.token import Token
 from core.visitors.node_visitor import NodeVisitor
 
 
-_SHOULD_LOG_SCOPE = ast.literal_eval(os.environ['_SHOULD_LOG_SCOPE'])
-
-
 class SemanticAnalyzer(NodeVisitor):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        symbol_table: Callable[..., ScopedSymbolTable] = FlatSymbolTable,
+        recover: bool = False
+    ) -> None:
+        # class of the scopes, ScopedSymbolTable or FlatSymbolTable
+        self.symbol_table = symbol_table
         self.current_scope: ScopedSymbolTable
-
-    def error(self, error_code: ErrorCode, token: Token) -> SemanticError:
-        raise SemanticError(
+        self.log = tracing.tracer(tracing.SCOPE, '⓷ Semantics | ')
+        # when True, errors are collected in `errors` and the analysis goes
+        # on, instead of stopping at the first one
+        self.recover = recover
+        self.errors: List[SemanticError] = []
+        # symbols defined in place of the missing ones, so their other uses
+        # are not reported again
+        self.placeholders: Set[Symbol] = set()
+
+    def semantic_error(
+        self,
+        error_code: ErrorCode,
+        token: Token
+    ) -> SemanticError:
+        return SemanticError(
             error_code=error_code,
             token=token,
             message=f'{error_code.value} -> {token}',
         )
 
-    def log(self, msg: str) -> None:
-        if _SHOULD_LOG_SCOPE:
-            print(f'⓷ Semantics | {msg}')
+    def error(self, error_code: ErrorCode, token: Token) -> SemanticError:
+        raise self.semantic_error(error_code, token)
+
+    def report(self, error_code: ErrorCode, token: Token) -> None:
+        """Keep the error when recovering, raise it otherwise."""
+        if not self.recover:
+            self.error(error_code, token)
+        self.errors.append(self.semantic_error(error_code, token))
+
+    def analyze(self, tree: Program) -> List[SemanticError]:
+        """Analyze the program, return the errors found when recovering."""
+        self.visit(tree)
+        return self.errors
 
     def visit_BinOp(self, node: BinOp) -> None:
         self.visit(node.left)
@@ -42,6 +68,9 @@ class SemanticAnalyzer(NodeVisitor):
             self.visit(declaration)
         self.visit(node.compound_statement)
 
+        # accessed by the interpreter to lay out the activation record
+        node.slot_names = tuple(self.current_scope.slot_names)
+
     def visit_Compound(self, node: Compound) -> None:
         for child in node.children:
             self.visit(child)
@@ -55,7 +84,7 @@ class SemanticAnalyzer(NodeVisitor):
 
         self.log(f'ENTER scope: {fn_name}')
         # Scope for parameters and local variables
-        procedure_scope = ScopedSymbolTable(
+        procedure_scope = self.symbol_table(
             name=fn_name,
             level=self.current_scope.scope_level + 1,
             enclosing_scope=self.current_scope
@@ -63,7 +92,8 @@ class SemanticAnalyzer(NodeVisitor):
         self.current_scope = procedure_scope
 
         # Insert parameters into the procedure scope
-        self.log(f'{node.params}')
+        if self.log.enabled:
+            self.log(f'{node.params}')
         for param in node.params:
             param_type = self.current_scope.lookup(param.type_node.value)
             param_name = param.var_node.value
@@ -91,10 +121,20 @@ class SemanticAnalyzer(NodeVisitor):
         procedure_decl = self.current_scope.lookup(node.proc_name)
 
         if procedure_decl == None:
-            self.error(ErrorCode.ID_NOT_FOUND, node.token)
-
-        if len(actual_params) != len(procedure_decl.formal_params):
-            self.error(ErrorCode.INVALID_NUM_ARGS, node.token)
+            self.report(ErrorCode.ID_NOT_FOUND, node.token)
+            procedure_decl = ProcedureSymbol(node.proc_name)
+            self.current_scope.define(procedure_decl)
+            self.placeholders.add(procedure_decl)
+        elif not isinstance(
+            procedure_decl, (ProcedureSymbol, FunctionSymbol)
+        ):
+            # a variable, or a type: there is no procedure of this name
+            self.report(ErrorCode.ID_NOT_FOUND, node.token)
+        elif (
+            len(actual_params) != len(procedure_decl.formal_params) and
+            procedure_decl not in self.placeholders
+        ):
+            self.report(ErrorCode.INVALID_NUM_ARGS, node.token)
 
         for param_node in actual_params:
             self.visit(param_node)
@@ -109,7 +149,7 @@ class SemanticAnalyzer(NodeVisitor):
 
         self.log(f'ENTER scope: {proc_name}')
         # Scope for parameters and local variables
-        procedure_scope = ScopedSymbolTable(
+        procedure_scope = self.symbol_table(
             name=proc_name,
             level=self.current_scope.scope_level + 1,
             enclosing_scope=self.current_scope
@@ -117,7 +157,8 @@ class SemanticAnalyzer(NodeVisitor):
         self.current_scope = procedure_scope
 
         # Insert parameters into the procedure scope
-        self.log(f'{node.params}')
+        if self.log.enabled:
+            self.log(f'{node.params}')
         for param in node.params:
             param_type = self.current_scope.lookup(param.type_node.value)
             param_name = param.var_node.value
@@ -135,7 +176,7 @@ class SemanticAnalyzer(NodeVisitor):
 
     def visit_Program(self, node: Program) -> None:
         self.log('ENTER scope: global')
-        global_scope = ScopedSymbolTable(
+        global_scope = self.symbol_table(
             name='global', level=1,
             enclosing_scope=None
         )
@@ -151,10 +192,22 @@ class SemanticAnalyzer(NodeVisitor):
 
     def visit_Var(self, node: Var) -> None:
         var_name = node.value
-        var_symbol = self.current_scope.lookup(var_name)
+        var_symbol, scope_level = (
+            self.current_scope.lookup(var_name, with_scope=True) or
+            (None, None)
+        )
 
         if var_symbol is None:
-            self.error(ErrorCode.ID_NOT_FOUND, node.token)
+            self.report(ErrorCode.ID_NOT_FOUND, node.token)
+            var_symbol = VarSymbol(var_name, None)
+            self.current_scope.define(var_symbol)
+            self.placeholders.add(var_symbol)
+            scope_level = self.current_scope.scope_level
+
+        # accessed by the interpreter to read the variable without a lookup
+        if isinstance(var_symbol, VarSymbol):
+            node.depth = self.current_scope.scope_level - scope_level
+            node.slot = var_symbol.slot
 
     def visit_VarDecl(self, node: VarDecl) -> None:
         type_name = node.type_node.value
@@ -168,6 +221,8 @@ class SemanticAnalyzer(NodeVisitor):
         # Signal an error if the table alrady has a symbol
         # with the same name
         if self.current_scope.lookup(var_name, current_scope_only=True):
-            self.error(ErrorCode.DUPLICATE_ID, node.var_node.token)
+            # the first declaration is kept
+            self.report(ErrorCode.DUPLICATE_ID, node.var_node.token)
+            return
 
         self.current_scope.define(var_symbol)
@@ -1,137 +1,142 @@
+from typing import IO, List, Optional
+
+from core.ast import *
 from core.visitors.node_visitor import NodeVisitor
-from core.symbol import ScopedSymbolTable, VarSymbol, ProcedureSymbol
 
-class Source2Source(NodeVisitor):
-    def __init__(self):
-        self.current_scope = None
-        self.new_source = ''
 
-    def tabs(self, n):
+class Source2Source(NodeVisitor):
+    """Rewrite an analyzed program with every name tagged by its scope level.
+
+    The output is written once, piece by piece, to a list or to the text
+    file `out`, so its cost is linear in its size. Variables are resolved
+    through the depth and slot set by the SemanticAnalyzer: the only scope
+    state kept is the type name of every variable, by slot, of each open
+    scope.
+    """
+
+    def __init__(self, out: Optional[IO[str]] = None) -> None:
+        self.parts: List[str] = []
+        self.write = out.write if out is not None else self.parts.append
+        self.scope_level = 0
+        # type names of the variables of every open scope, by slot
+        self.scope_types: List[List[str]] = []
+        # the end of the last `end;` line, held back so the enclosing
+        # procedure or program can end it its own way
+        self.pending = ''
+
+    def translate(self, tree: Program) -> str:
+        """Rewrite `tree`; return the new source, unless written to `out`.
+
+        Raises ValueError if the tree was not analyzed.
+        """
+        self.visit(tree)
+        return self.new_source
+
+    @property
+    def new_source(self) -> str:
+        return ''.join(self.parts)
+
+    def emit(self, text: str) -> None:
+        if self.pending:
+            self.write(self.pending)
+            self.pending = ''
+        self.write(text)
+
+    def tabs(self, n: int) -> str:
         return '  ' * n
 
+    def open_scope(self) -> None:
+        self.scope_level += 1
+        self.scope_types.append([])
+
+    def close_scope(self) -> None:
+        self.scope_level -= 1
+        self.scope_types.pop()
+
     def visit_Assign(self, node):
-        self.new_source += self.tabs(self.current_scope.scope_level + 1)
+        self.emit(self.tabs(self.scope_level + 1))
         self.visit(node.left)
-        self.new_source += ' := '
+        self.emit(' := ')
         self.visit(node.right)
-        self.new_source += ';\n'
+        self.emit(';\n')
 
     def visit_BinOp(self, node):
         self.visit(node.left)
-        self.new_source += f' {node.op.value} '
+        self.emit(f' {node.op.value} ')
         self.visit(node.right)
 
     def visit_Block(self, node):
         for declaration in node.declarations:
             self.visit(declaration)
-        self.new_source += '\n'
+        self.emit('\n')
         self.visit(node.compound_statement)
 
     def visit_Compound(self, node):
-        self.new_source += self.tabs(self.current_scope.scope_level - 1)
-        self.new_source += 'begin\n'
+        self.emit(f'{self.tabs(self.scope_level - 1)}begin\n')
 
         for child in node.children:
             self.visit(child)
 
         if len(node.children) == 1:
-            self.new_source += '\n'
+            self.emit('\n')
 
-        self.new_source += self.tabs(self.current_scope.scope_level - 1)
-        self.new_source += 'end;\n'
+        self.emit(f'{self.tabs(self.scope_level - 1)}end')
+        self.pending = ';\n'
 
     def visit_NoOp(self, node):
         pass
 
     def visit_Num(self, node):
-        self.new_source += f'{node.value}'
+        self.emit(f'{node.value}')
 
     def visit_ProcedureDecl(self, node):
-        proc_name = node.proc_name
-        proc_symbol = ProcedureSymbol(proc_name)
-        self.current_scope.define(proc_symbol)
-
-        # Scope for parameters and local variables
-        procedure_scope = ScopedSymbolTable(
-            name=proc_name,
-            level=self.current_scope.scope_level+1,
-            enclosing_scope=self.current_scope
-        )
-        self.current_scope = procedure_scope
+        level = self.scope_level
+        self.open_scope()
 
-        # Insert parameters into the procedure scope
-        aux_new_source = ''
+        params = []
         for param in node.params:
-            param_type = self.current_scope.lookup(param.type_node.value)
-            param_name = param.var_node.value
-            var_symbol = VarSymbol(param_name, param_type)
-            self.current_scope.define(var_symbol)
-            proc_symbol.params.append(var_symbol)
-
-            aux_new_source += f'{var_symbol.name} : {var_symbol.type},'
-        aux_new_source = aux_new_source[:-1]
-
-        self.new_source += self.tabs(self.current_scope.enclosing_scope.scope_level)
-        self.new_source += (
-            f'procedure {proc_symbol.name}'
-            f'{self.current_scope.enclosing_scope.scope_level}'
-            f'({aux_new_source});\n'
+            param_type = param.type_node.value
+            self.scope_types[-1].append(param_type)
+            params.append(f'{param.var_node.value} : {param_type}')
+
+        self.emit(
+            f'{self.tabs(level)}procedure {node.proc_name}{level}'
+            f'({",".join(params)});\n'
         )
 
         self.visit(node.block_node)
-        self.current_scope = self.current_scope.enclosing_scope
-        self.new_source = f'{self.new_source[:-1]}'
-        self.new_source += f' {{END OF {node.proc_name}}}\n'
+        self.close_scope()
+        self.pending = ''
+        self.write(f'; {{END OF {node.proc_name}}}\n')
 
     def visit_Program(self, node):
-        global_scope = ScopedSymbolTable(
-            name='global', level=1,
-            enclosing_scope=self.current_scope
-        )
-        self.current_scope = global_scope
+        self.open_scope()
 
-        self.new_source += f'program {node.name}0;\n'
+        self.emit(f'program {node.name}0;\n')
 
         self.visit(node.block)
-        self.current_scope = self.current_scope.enclosing_scope
-
-        self.new_source = f'{self.new_source[:-2]}. {{END OF {node.name}}}'
+        self.close_scope()
+        self.pending = ''
+        self.write(f'. {{END OF {node.name}}}')
 
     def visit_UnaryOp(self, node):
         self.visit(node.expr)
 
     def visit_Var(self, node):
-        var_name = node.value
-        var_symbol, level = self.current_scope.lookup(var_name, with_scope=True)
-
-        if var_symbol is None:
-            raise Exception(
-                f"SemanticError: Symbol(identifier) not found '{var_name}'"
+        if node.depth is None:
+            raise ValueError(
+                f'Variable {node.value!r} is not resolved: the tree must be '
+                f'analyzed by the SemanticAnalyzer first'
             )
-
-        self.new_source += f'<{var_symbol.name}{level}:{var_symbol.type}>'
+        level = self.scope_level - node.depth
+        var_type = self.scope_types[level - 1][node.slot]
+        self.emit(f'<{node.value}{level}:{var_type}>')
 
     def visit_VarDecl(self, node):
-        type_name = node.type_node.value
-        type_symbol = self.current_scope.lookup(type_name)
-
-        # We have all the information we need to create a variable symbol.
-        # Create the symbol and insert it into the symbol table.
-        var_name = node.var_node.value
-        var_symbol = VarSymbol(var_name, type_symbol)
-
-        # Signal an error if the table alrady has a symbol
-        # with the same name
-        if self.current_scope.lookup(var_name, current_scope_only=True):
-            raise Exception(
-                "Error: Duplicate identifier '%s' found" % var_name
-            )
-
-        self.current_scope.define(var_symbol)
+        var_type = node.type_node.value
+        self.scope_types[-1].append(var_type)
 
-        self.new_source += self.tabs(self.current_scope.scope_level)
-        self.new_source += (
-            f'var {var_symbol.name}{self.current_scope.scope_level}'
-            f' : {var_symbol.type};\n'
+        self.emit(
+            f'{self.tabs(self.scope_level)}var {node.var_node.value}'
+            f'{self.scope_level} : {var_type};\n'
         )
-
@@ -0,0 +1,2 @@
+from core.vm.compiler import Compiler
+from core.vm.machine import VirtualMachine
@@ -0,0 +1,98 @@
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from core.activation_record import ARType
+from core.vm.opcodes import (
+    BINARY, BINARY_CONST, BINARY_LOCAL, OPCODES, OPERATORS
+)
+
+Const = Union[int, float]
+# An instruction: its opcode and two operands, unused ones are 0
+Instruction = Tuple[int, int, int]
+
+class CodeObject(object):
+    """Bytecode of the main program or of a single procedure.
+
+    Locals live in a fixed-size frame, at the slots the SemanticAnalyzer
+    gave them (see `Block.slot_names`): the parameters first, then the
+    local variables.
+    """
+    __slots__ = (
+        'name', 'ar_type', 'level', 'code', 'consts', 'slot_names',
+        'nparams', '_const_index', '_instructions'
+    )
+
+    def __init__(
+        self,
+        name: str,
+        ar_type: ARType,
+        level: int,
+        slot_names: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.ar_type = ar_type
+        # nesting level of the code, as the interpreter's activation records
+        self.level = level
+        self.code = array('i')
+        self.consts: List[Const] = []
+        self.slot_names: List[str] = list(slot_names)
+        self.nparams = 0
+        self._const_index: Dict[Tuple[type, Const], int] = {}
+        self._instructions: Optional[List[Instruction]] = None
+
+    @property
+    def nslots(self) -> int:
+        return len(self.slot_names)
+
+    def emit(self, opcode: int, a: int = 0, b: int = 0) -> None:
+        self.code.extend((opcode, a, b))
+        self._instructions = None
+
+    def add_const(self, value: Const) -> int:
+        # the type is part of the key so that 1 and 1.0 stay distinct
+        key = (type(value), value)
+        index = self._const_index.get(key)
+        if index is None:
+            index = self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return index
+
+    def instructions(self) -> List[Instruction]:
+        """The code as one (opcode, a, b) tuple per instruction.
+
+        Built once and kept, so that running a program again does not
+        split its code again.
+        """
+        if self._instructions is None:
+            operands = iter(self.code)
+            self._instructions = list(zip(operands, operands, operands))
+        return self._instructions
+
+    def add_slot(self, name: str) -> int:
+        """Slot of a name the SemanticAnalyzer did not resolve to one."""
+        if name not in self.slot_names:
+            self.slot_names.append(name)
+        return self.slot_names.index(name)
+
+    def disassemble(self) -> str:
+        lines = [f'{self.ar_type.value} {self.name} (level {self.level})']
+        for pc, (opcode, a, b) in enumerate(self.instructions()):
+            name, noperands = OPCODES[opcode]
+            operands = [str(a), str(b)][:noperands]
+            if opcode in (BINARY, BINARY_LOCAL, BINARY_CONST):
+                operands[0] = OPERATORS[a][0]
+            lines.append(f'  {pc:>5} {name:<12} {" ".join(operands)}'.rstrip())
+        return '\n'.join(lines)
+
+class CompiledProgram(object):
+    """The main program code plus every procedure, indexed by CALL."""
+    def __init__(self, main: CodeObject, procedures: List[CodeObject]) -> None:
+        self.main = main
+        self.procedures = procedures
+        # the deepest nesting level, which sizes the display of the VM
+        self.depth = max(code.level for code in [main] + procedures)
+
+    def disassemble(self) -> str:
+        return '\n\n'.join(
+            code.disassemble() for code in [self.main] + self.procedures
+        )
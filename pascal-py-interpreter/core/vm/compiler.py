@@ -0,0 +1,148 @@
+from typing import Dict, List
+
+from core.activation_record import ARType
+from core.ast import *
+from core.token import TokenType
+from core.visitors.node_visitor import NodeVisitor
+from core.vm import opcodes as op
+from core.vm.code import CodeObject, CompiledProgram
+
+_OPERATORS = {
+    TokenType.PLUS:        op.ADD,
+    TokenType.MINUS:       op.SUB,
+    TokenType.MUL:         op.MUL,
+    TokenType.INTEGER_DIV: op.INT_DIV,
+    TokenType.FLOAT_DIV:   op.FLOAT_DIV,
+}
+
+class Compiler(NodeVisitor):
+    """Compile a semantically checked Program AST to VM bytecode.
+
+    Variables are accessed through the (depth, slot) pairs the
+    SemanticAnalyzer resolved them to: locals with LOAD/STORE_LOCAL, the
+    variables of enclosing procedures with LOAD/STORE_OUTER and the
+    nesting level of their frame in the display of the VM.
+    """
+    def __init__(self) -> None:
+        # code objects of the enclosing scopes, innermost last
+        self.scopes: List[CodeObject] = []
+        self.procedures: List[CodeObject] = []
+        # procedure body (Block node) -> procedure index
+        self.procedure_index: Dict[Block, int] = {}
+
+    @property
+    def code(self) -> CodeObject:
+        return self.scopes[-1]
+
+    def compile(self, tree: Program) -> CompiledProgram:
+        main = self.visit(tree)
+        return CompiledProgram(main, self.procedures)
+
+    def emit_access(self, node: Var, local: int, outer: int) -> None:
+        code = self.code
+        if node.slot is None:
+            # not a variable (e.g. a procedure name): like the interpreter,
+            # kept in the current frame
+            code.emit(local, code.add_slot(node.value))
+        elif node.depth:
+            code.emit(outer, code.level - node.depth, node.slot)
+        else:
+            code.emit(local, node.slot)
+
+    def compile_procedure(
+        self,
+        name: str,
+        params: List[Param],
+        block_node: Block
+    ) -> None:
+        assert block_node.slot_names is not None
+        code = CodeObject(
+            name, ARType.PROCEDURE, self.code.level + 1,
+            block_node.slot_names
+        )
+        # registered before the body is compiled, so recursive calls resolve
+        self.procedure_index[block_node] = len(self.procedures)
+        self.procedures.append(code)
+        code.nparams = len(params)
+
+        self.scopes.append(code)
+        self.visit(block_node)
+        code.emit(op.RETURN)
+        self.scopes.pop()
+
+    def visit_Program(self, node: Program) -> CodeObject:
+        assert node.block.slot_names is not None
+        main = CodeObject(
+            node.name, ARType.PROGRAM, 1, node.block.slot_names
+        )
+        self.scopes.append(main)
+        self.visit(node.block)
+        main.emit(op.RETURN)
+        self.scopes.pop()
+        return main
+
+    def visit_Block(self, node: Block) -> None:
+        for declaration in node.declarations:
+            self.visit(declaration)
+        self.visit(node.compound_statement)
+
+    def visit_VarDecl(self, node: VarDecl) -> None:
+        pass
+
+    def visit_ProcedureDecl(self, node: ProcedureDecl) -> None:
+        self.compile_procedure(node.proc_name, node.params, node.block_node)
+
+    def visit_FunctionDecl(self, node: FunctionDecl) -> None:
+        self.compile_procedure(node.fn_name, node.params, node.block_node)
+
+    def visit_Compound(self, node: Compound) -> None:
+        for child in node.children:
+            self.visit(child)
+
+    def visit_NoOp(self, node: NoOp) -> None:
+        pass
+
+    def visit_Assign(self, node: Assign) -> None:
+        self.visit(node.right)
+        self.emit_access(node.left, op.STORE_LOCAL, op.STORE_OUTER)
+
+    def visit_ProcedureCall(self, node: ProcedureCall) -> None:
+        for param_node in node.actual_params:
+            self.visit(param_node)
+
+        proc_symbol = node.proc_symbol
+        assert proc_symbol is not None
+        self.code.emit(op.CALL, self.procedure_index[proc_symbol.block_ast])
+
+    def visit_BinOp(self, node: BinOp) -> None:
+        operator = _OPERATORS[node.token_type]
+        right = node.right
+        self.visit(node.left)
+
+        # a local or a constant right operand is folded into the operator
+        if isinstance(right, Var) and right.slot is not None and \
+                not right.depth:
+            self.code.emit(op.BINARY_LOCAL, operator, right.slot)
+        elif isinstance(right, Num):
+            self.code.emit(
+                op.BINARY_CONST, operator, self.const(right)
+            )
+        else:
+            self.visit(right)
+            self.code.emit(op.BINARY, operator)
+
+    def visit_UnaryOp(self, node: UnaryOp) -> None:
+        self.visit(node.expr)
+        if node.token_type == TokenType.MINUS:
+            self.code.emit(op.NEG)
+
+    def const(self, node: Num) -> int:
+        value = node.value
+        assert isinstance(value, (int, float))
+        return self.code.add_const(value)
+
+    def visit_Num(self, node: Num) -> None:
+        self.code.emit(op.PUSH_CONST, self.const(node))
+
+    def visit_Var(self, node: Var) -> None:
+        self.emit_access(node, op.LOAD_LOCAL, op.LOAD_OUTER)
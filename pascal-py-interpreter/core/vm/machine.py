@@ -0,0 +1,155 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import tracing
+from core.activation_record import ActivationRecord
+from core.stack import Stack
+from core.vm.code import CodeObject, CompiledProgram
+from core.vm.opcodes import (
+    LOAD_LOCAL, BINARY_LOCAL, STORE_LOCAL, BINARY, BINARY_CONST, PUSH_CONST,
+    LOAD_OUTER, STORE_OUTER, NEG, CALL, RETURN, OPERATORS
+)
+
+# A frame holds the parameters and locals of a call, by slot
+Frame = List[Any]
+
+
+class VirtualMachine(object):
+    """Stack based virtual machine running a CompiledProgram.
+
+    Expressions are evaluated on an operand stack. Every call gets a frame,
+    a plain list of the parameters and locals of the procedure. The display
+    holds the frame of the innermost active call of every nesting level,
+    which are the frames of the enclosing procedures of the running one:
+    their variables are read with a single index, without following static
+    links.
+    """
+    def __init__(
+        self,
+        program: CompiledProgram,
+        trace: Optional[bool] = None
+    ) -> None:
+        self.program = program
+        # (code object, frame) of every active call, innermost last
+        self.frames: List[Tuple[CodeObject, Frame]] = []
+        self.log = tracing.tracer(tracing.STACK, '⓸ VM | ', trace)
+
+    def call_stack(self) -> Stack:
+        """The active frames in the format of the interpreter call stack."""
+        stack = Stack()
+        for code, frame in self.frames:
+            ar = ActivationRecord(code.name, code.ar_type, code.level)
+            for name, value in zip(code.slot_names, frame):
+                if value is not None:
+                    ar[name] = value
+            stack.push(ar)
+        return stack
+
+    def unbound(self, frame: Frame, slot: int) -> None:
+        """Report a read of a variable that was never assigned."""
+        # find the procedure owning the frame to report the variable name
+        for code, active_frame in self.frames:
+            if active_frame is frame:
+                raise NameError(repr(code.slot_names[slot]))
+
+    def run(self) -> Dict[str, Any]:
+        """Run the program, and return its final global variables."""
+        frames = self.frames
+        log = self.log
+        trace = log.enabled
+        procedures = self.program.procedures
+        decoded = {
+            id(code_obj): code_obj.instructions()
+            for code_obj in [self.program.main] + procedures
+        }
+        operators = [function for _, function in OPERATORS]
+
+        code_obj = self.program.main
+        frame: Frame = [None] * code_obj.nslots
+        code = decoded[id(code_obj)]
+        consts = code_obj.consts
+        pc = 0
+
+        display: List[Frame] = [frame] * (self.program.depth + 1)
+        stack: List[Any] = []
+        push = stack.append
+        pop = stack.pop
+        # (code object, return pc, frame) of the callers, and the frames
+        # the callees replaced in the display
+        returns: List[Tuple[CodeObject, int, Frame, Frame]] = []
+
+        frames.append((code_obj, frame))
+        if trace:
+            log(f'ENTER: {code_obj.ar_type.value} {code_obj.name}')
+            log(str(self.call_stack()))
+
+        while True:
+            opcode, a, b = code[pc]
+            pc += 1
+            if opcode == LOAD_LOCAL:
+                value = frame[a]
+                if value is None:
+                    self.unbound(frame, a)
+                push(value)
+            elif opcode == BINARY_LOCAL:
+                value = frame[b]
+                if value is None:
+                    self.unbound(frame, b)
+                stack[-1] = operators[a](stack[-1], value)
+            elif opcode == STORE_LOCAL:
+                frame[a] = pop()
+            elif opcode == BINARY:
+                right = pop()
+                stack[-1] = operators[a](stack[-1], right)
+            elif opcode == BINARY_CONST:
+                stack[-1] = operators[a](stack[-1], consts[b])
+            elif opcode == PUSH_CONST:
+                push(consts[a])
+            elif opcode == LOAD_OUTER:
+                outer = display[a]
+                value = outer[b]
+                if value is None:
+                    self.unbound(outer, b)
+                push(value)
+            elif opcode == STORE_OUTER:
+                display[a][b] = pop()
+            elif opcode == NEG:
+                stack[-1] = -stack[-1]
+            elif opcode == CALL:
+                callee = procedures[a]
+                new_frame: Frame = [None] * callee.nslots
+                nparams = callee.nparams
+                if nparams:
+                    new_frame[:nparams] = stack[-nparams:]
+                    del stack[-nparams:]
+
+                level = callee.level
+                returns.append((code_obj, pc, frame, display[level]))
+                display[level] = new_frame
+                code_obj = callee
+                code = decoded[id(callee)]
+                consts = callee.consts
+                frame = new_frame
+                pc = 0
+
+                frames.append((code_obj, frame))
+                if trace:
+                    log(f'ENTER: PROCEDURE {code_obj.name}')
+                    log(str(self.call_stack()))
+            elif opcode == RETURN:
+                if trace:
+                    log(f'LEAVE: {code_obj.ar_type.value} {code_obj.name}')
+                    log(str(self.call_stack()))
+                frames.pop()
+
+                if not returns:
+                    return {
+                        name: value
+                        for name, value in zip(code_obj.slot_names, frame)
+                        if value is not None
+                    }
+                level = code_obj.level
+                code_obj, pc, frame, display[level] = returns.pop()
+                code = decoded[id(code_obj)]
+                consts = code_obj.consts
+            else:
+                raise RuntimeError(f'Unknown opcode {opcode} at {pc - 1}')
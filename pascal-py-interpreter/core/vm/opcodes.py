@@ -0,0 +1,56 @@
+# Instruction set of the bytecode VM.
+#
+# Every instruction is an opcode followed by two integer operands, 0 when
+# unused, all stored flat in the `array('i')` of a CodeObject: the fixed
+# width lets the VM split the array into instructions at C speed. Opcodes
+# are plain ints rather than an Enum so that the dispatch loop compares
+# small ints, and they are numbered by how often they run, which is the
+# order the loop tests them in. Arithmetic is a single family of opcodes
+# whose operator is an operand, looked up in OPERATORS; the right operand
+# of an operator may be folded into it when it is a local variable or a
+# constant.
+import operator
+
+from typing import Any, Callable, Tuple
+
+LOAD_LOCAL    = 0   # slot                  -> push frame[slot]
+BINARY_LOCAL  = 1   # operator, slot        -> top = top <operator> frame[slot]
+STORE_LOCAL   = 2   # slot                  -> frame[slot] = pop
+BINARY        = 3   # operator              -> top = top <operator> pop
+BINARY_CONST  = 4   # operator, const index -> top <operator>= consts[index]
+PUSH_CONST    = 5   # const index           -> push consts[index]
+LOAD_OUTER    = 6   # level, slot           -> push display[level][slot]
+STORE_OUTER   = 7   # level, slot           -> display[level][slot] = pop
+NEG           = 8
+CALL          = 9   # procedure index
+RETURN        = 10
+
+# opcode -> (name, number of operands)
+OPCODES = {
+    LOAD_LOCAL:   ('LOAD_LOCAL', 1),
+    BINARY_LOCAL: ('BINARY_LOCAL', 2),
+    STORE_LOCAL:  ('STORE_LOCAL', 1),
+    BINARY:       ('BINARY', 1),
+    BINARY_CONST: ('BINARY_CONST', 2),
+    PUSH_CONST:   ('PUSH_CONST', 1),
+    LOAD_OUTER:   ('LOAD_OUTER', 2),
+    STORE_OUTER:  ('STORE_OUTER', 2),
+    NEG:          ('NEG', 0),
+    CALL:         ('CALL', 1),
+    RETURN:       ('RETURN', 0),
+}
+
+
+def _float_div(left: Any, right: Any) -> float:
+    return float(left) / float(right)
+
+
+# Operators of the BINARY family, by their operand: (name, function)
+ADD, SUB, MUL, INT_DIV, FLOAT_DIV = range(5)
+OPERATORS: Tuple[Tuple[str, Callable[[Any, Any], Any]], ...] = (
+    ('ADD', operator.add),
+    ('SUB', operator.sub),
+    ('MUL', operator.mul),
+    ('INT_DIV', operator.floordiv),
+    ('FLOAT_DIV', _float_div),
+)
@@ -1,15 +1,34 @@
 import argparse
-import subprocess
 import os
 import sys
+import time
+
+from core import ENGINES, batch, cache, profiling, render, tracing
+from core.lexer import Lexer
+from core.parser import Parser
+from core.visitors.pascal import Interpreter
+from core.visitors.call_profile import ProfilingInterpreter
+from core.visitors.closure import ClosureInterpreter
+from core.visitors.python_codegen import PythonInterpreter
+from core.vm import Compiler, VirtualMachine
+from core.visitors.semantic import SemanticAnalyzer
+from core.visitors.optimizer import ConstantFolder
+from core.errors.lexer import LexerError
+from core.errors.parser import ParserError
+from core.errors.semantic import SemanticError
 
 
+# Phases timed by --profile
+PHASES = [
+    'lexer', 'parser', 'semantic', 'visualizer', 'optimizer', 'interpreter'
+]
+
 # Command line arguments
 parser = argparse.ArgumentParser(
     description='SPI - Simple Pascal Interpreter'
 )
 # >> argument definition
-parser.add_argument('inputfile', help='Pascal source file')
+parser.add_argument('inputfile', nargs='?', help='Pascal source file')
 parser.add_argument(
     '--scope',
     help='Print scope information',
@@ -22,71 +41,349 @@ parser.add_argument(
 )
 parser.add_argument(
     '--viz',
-    help='Generate AST visualization for analysis',
+    help=(
+        'Write the AST as DOT to ast_tree/dot, and render it to ast_tree/png '
+        'in the background while the program runs'
+    ),
     action='store_true',
 )
-# >> argument parsing
-args = parser.parse_args()
+parser.add_argument(
+    '--viz-format',
+    help='Write the AST as DOT, rendered to PNG, or as JSON to ast_tree/json',
+    choices=['dot', 'json'],
+    default='dot',
+)
+parser.add_argument(
+    '--viz-depth',
+    help='Leave out the nodes deeper than this in the AST visualization',
+    type=int,
+    metavar='N',
+)
+parser.add_argument(
+    '--viz-nodes',
+    help='Leave out the nodes after the first N in the AST visualization',
+    type=int,
+    metavar='N',
+)
+parser.add_argument(
+    '--viz-procedure',
+    help='Only visualize the declaration of this procedure or function',
+    metavar='NAME',
+)
+parser.add_argument(
+    '--viz-collapse',
+    help='Visualize identical subtrees of the AST once, and share them',
+    action='store_true',
+)
+parser.add_argument(
+    '--no-cache',
+    help='Neither read nor write the analyzed program cache',
+    action='store_true',
+)
+parser.add_argument(
+    '-O',
+    dest='optimize',
+    help='Fold constant expressions before running the program',
+    action='store_true',
+)
+parser.add_argument(
+    '--engine',
+    help=(
+        'Execution engine: walk the AST, compile it into closures first, '
+        'compile it to bytecode for the stack VM or transpile it to Python'
+    ),
+    choices=ENGINES,
+    default='tree',
+)
+parser.add_argument(
+    '--dump-py',
+    help='Write the Python module generated by --engine=py to this file',
+    metavar='FILE',
+)
+parser.add_argument(
+    '--all-errors',
+    help=(
+        'Report every syntax and semantic error of the program, not only '
+        'the first one'
+    ),
+    action='store_true',
+)
+parser.add_argument(
+    '--profile',
+    help=(
+        'Print the time, memory and tokens or nodes of every phase; the '
+        'program is lexed before it is parsed and the cache is bypassed'
+    ),
+    action='store_true',
+)
+parser.add_argument(
+    '--profile-phase',
+    help='Also run this phase under cProfile and print its statistics',
+    choices=PHASES,
+)
+parser.add_argument(
+    '--profile-output',
+    help='Write the cProfile statistics of --profile-phase to this file',
+    metavar='FILE',
+)
+parser.add_argument(
+    '--call-profile',
+    help=(
+        'Print the calls, time and stack depth of every procedure and the '
+        'AST nodes evaluated (tree engine)'
+    ),
+    action='store_true',
+)
+parser.add_argument(
+    '--flamegraph',
+    help='Write the call stacks in the collapsed format of flamegraph.pl',
+    metavar='FILE',
+)
+parser.add_argument(
+    '--batch',
+    help=(
+        'Run every program named by these paths or glob patterns in a pool '
+        'of worker processes, and print one JSON result per program'
+    ),
+    nargs='*',
+    metavar='PATH',
+)
+parser.add_argument(
+    '--manifest',
+    help='With --batch, a file listing more paths or patterns, one per line',
+    metavar='FILE',
+)
+parser.add_argument(
+    '--jobs',
+    help='Worker processes of --batch (default: one per CPU)',
+    type=int,
+)
 
-# Define environment variable to control logging
-os.environ['_SHOULD_LOG_SCOPE'] = f'{args.scope}'
-os.environ['_SHOULD_LOG_STACK'] = f'{args.stack}'
 
+# >> argument parsing
+def parse_args(argv=None):
+    args = parser.parse_args(argv)
+    args.batch_mode = args.batch is not None or args.manifest is not None
+    # the options of the visualization turn it on
+    args.viz = args.viz or bool(
+        args.viz_format != 'dot' or args.viz_depth is not None or
+        args.viz_nodes is not None or args.viz_procedure or args.viz_collapse
+    )
+    if args.batch_mode:
+        # the options of a single run, which the workers would ignore
+        single_run = {
+            '--viz': args.viz,
+            '--scope': args.scope,
+            '--stack': args.stack,
+            '--no-cache': args.no_cache,
+            '--dump-py': args.dump_py,
+            '--profile': args.profile,
+            '--profile-phase': args.profile_phase,
+            '--profile-output': args.profile_output,
+            '--call-profile': args.call_profile,
+            '--flamegraph': args.flamegraph,
+        }
+        if args.inputfile:
+            parser.error('--batch takes paths, and no inputfile')
+        given = [option for option, value in single_run.items() if value]
+        if given:
+            parser.error(f'--batch takes no {", ".join(given)}')
+    if not args.batch_mode and args.inputfile is None:
+        parser.error('the following arguments are required: inputfile')
+    if (args.call_profile or args.flamegraph) and args.engine != 'tree':
+        parser.error('--call-profile and --flamegraph need --engine=tree')
+    return args
 
-from core.lexer import Lexer
-from core.parser import Parser
-from core.visitors.pascal import Interpreter
-from core.visitors.semantic import SemanticAnalyzer
-from core.visitors.ast import ASTVisualizer
-from core.errors.lexer import LexerError
-from core.errors.parser import ParserError
-from core.errors.semantic import SemanticError
 
+def run_program(args):
+    program = args.inputfile
+    if args.profile or args.profile_phase:
+        profiler = profiling.Profiler(args.profile_phase, args.profile_output)
+    else:
+        profiler = profiling.NullProfiler()
 
-def main(program):
-    print(os.listdir(f'./programs'))
     if program in os.listdir(f'./programs'):
-        with open(f'./programs/{program}', 'r') as f:
-            code = ''.join(f.readlines())
+        program_path = f'./programs/{program}'
+        # the scope log is printed while analyzing, and a profile measures
+        # every phase, so both bypass the cache
+        use_cache = not (args.no_cache or args.scope or profiler.enabled)
 
-        print('⓵  Lexer + ⓶  Parser')
-        lexer = Lexer(code)
-        try:
-            parser = Parser(lexer)
-            tree = parser.parse()
-        except (LexerError, ParserError) as e:
-            print(e.message)
-            sys.exit(1)
+        # the program is hashed and lexed straight from the file, in chunks
+        with open(program_path, 'rb') as f:
+            tree = None
+            if use_cache:
+                source_digest = cache.digest_source(f)
+                tree = cache.load(program_path, source_digest)
+            cached = tree is not None
+            if cached:
+                print('⓵  Lexer + ⓶  Parser + ⓷  Semantics (cached)')
+            else:
+                print('⓵  Lexer + ⓶  Parser')
+                f.seek(0)
+                lexer = Lexer(f)
+                try:
+                    if profiler.enabled:
+                        # lexed in bulk and parsed from the TokenArray, so
+                        # the two phases are timed apart
+                        with profiler.phase('lexer') as phase:
+                            lexer = lexer.tokenize()
+                        phase.count, phase.unit = len(lexer), 'tokens'
+                    with profiler.phase('parser') as phase:
+                        parser = Parser(lexer, recover=args.all_errors)
+                        tree = parser.parse()
+                except (LexerError, ParserError) as e:
+                    print(e.message)
+                    sys.exit(1)
+                if parser.errors:
+                    for error in parser.errors:
+                        print(error.message)
+                    sys.exit(1)
 
+        # nodes handled by the phases, only counted for a profile
+        nodes = profiling.count_nodes(tree) if profiler.enabled else None
+        if not cached:
+            phase.count, phase.unit = nodes, 'nodes'
+
+        # the AST is written before it is analyzed, so an invalid program
+        # is still visualized; only valid ones are rendered to PNG below
+        viz_paths = []
         if args.viz:
             print('⌀ Abstract Syntax Tree Visualizer')
-            viz = ASTVisualizer(tree)
-            content = viz.gendot()
+            viz_format = args.viz_format
+            viz_path = (
+                f'./ast_tree/{viz_format}/'
+                f'{program.split(".")[0]}_ast.{viz_format}'
+            )
+            try:
+                with profiler.phase('visualizer') as phase:
+                    render.write_ast(
+                        tree,
+                        viz_path,
+                        format=viz_format,
+                        max_depth=args.viz_depth,
+                        max_nodes=args.viz_nodes,
+                        procedure=args.viz_procedure,
+                        collapse=args.viz_collapse,
+                    )
+            except ValueError as e:
+                print(f'⌀ AST not visualized: {e}')
+            else:
+                phase.count, phase.unit = nodes, 'nodes'
+                if viz_format == 'json':
+                    print(f'⌀ {viz_path}')
+                else:
+                    viz_paths.append(viz_path)
+
+        if not cached:
+            print('⓷  Semantics')
+            semantic_analyzer = SemanticAnalyzer(recover=args.all_errors)
+            try:
+                with profiler.phase('semantic') as phase:
+                    errors = semantic_analyzer.analyze(tree)
+            except SemanticError as e:
+                print(e.message)
+                sys.exit(1)
+            if errors:
+                for error in errors:
+                    print(error.message)
+                sys.exit(1)
+            phase.count, phase.unit = nodes, 'nodes'
 
-            with open(f'./ast_tree/dot/{program.split(".")[0]}_ast.dot', 'w') as f:
-                f.write(content)
+            if use_cache:
+                cache.store(program_path, source_digest, tree)
 
-        print('⓷  Semantics')
-        semantic_analyzer = SemanticAnalyzer()
+        # the PNG is rendered while the program runs
+        renderer = render.PngRenderer('./ast_tree/png')
+        renderer.start(viz_paths)
+
+        # the rendering is waited for even if the program fails
         try:
-            semantic_analyzer.visit(tree)
-        except SemanticError as e:
-            print(e.message)
-            sys.exit(1)
+            if args.optimize:
+                print('⓷  Optimizer')
+                folder = ConstantFolder()
+                with profiler.phase('optimizer') as phase:
+                    tree = folder.optimize(tree)
+                phase.count, phase.unit = nodes, 'nodes'
+                print(folder.report())
+
+            print('⓸  Interpreter')
+            # code generation is part of the phase, like the closure
+            # compilation
+            with profiler.phase('interpreter'):
+                if args.engine == 'vm':
+                    vm = VirtualMachine(Compiler().compile(tree))
+                    vm.run()
+                elif args.engine == 'py':
+                    interpreter = PythonInterpreter(tree)
+                    if args.dump_py:
+                        with open(args.dump_py, 'w') as f:
+                            f.write(interpreter.source)
+                    interpreter.interpret()
+                else:
+                    if args.engine == 'closure':
+                        interpreter = ClosureInterpreter(tree)
+                    elif args.call_profile or args.flamegraph:
+                        interpreter = ProfilingInterpreter(tree)
+                    else:
+                        interpreter = Interpreter(tree)
+                    interpreter.interpret()
+        finally:
+            if args.viz:
+                for png_path in renderer.wait():
+                    print(f'⌀ {png_path}')
+                if renderer.error:
+                    print(f'⌀ PNG not rendered: {renderer.error}')
 
-        subprocess.run([
-            'dot', '-Tpng', '-o', f'./ast_tree/png/{program.split(".")[0]}_ast.png',
-            f'./ast_tree/dot/{program.split(".")[0]}_ast.dot'
-        ])
+        if args.call_profile:
+            print('⏱  Procedures')
+            print(interpreter.profile.table())
+        if args.flamegraph:
+            with open(args.flamegraph, 'w') as f:
+                f.write(interpreter.profile.collapsed())
 
-        print('⓸  Interpreter')
-        interpreter = Interpreter(tree)
-        interpreter.interpret()
+        if profiler.enabled:
+            print('⏱  Profile')
+            print(profiler.report())
 
     else:
         raise Exception('No program was found.')
 
 
-if __name__ == '__main__':
+def run_batch(args):
+    paths = batch.expand(args.batch or [], args.manifest)
+    options = dict(
+        engine=args.engine,
+        optimize=args.optimize,
+        all_errors=args.all_errors,
+    )
+    start = time.perf_counter()
+    failed = 0
+    for result in batch.run_batch(paths, args.jobs, **options):
+        print(batch.to_ndjson(result), flush=True)
+        failed += result['status'] != batch.OK
+    elapsed = time.perf_counter() - start
+
+    # the summary goes to stderr, so stdout is only NDJSON
+    print(
+        f'{len(paths)} programs, {failed} failed, in {elapsed:.2f}s '
+        f'({len(paths) / elapsed if elapsed else 0:.0f} programs/s)',
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Enable the traces asked for, before any component is created
+    tracing.configure(scope=args.scope, stack=args.stack)
+
+    if args.batch_mode:
+        return run_batch(args)
     print(f'🎛  interpreting {args.inputfile}')
-    main(args.inputfile)
\ No newline at end of file
+    run_program(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
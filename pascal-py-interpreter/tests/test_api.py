@@ -0,0 +1,46 @@
+import pytest
+
+import core
+from core import tracing
+
+SOURCE = '''
+program Main;
+var x, y, unused : integer;
+    z : real;
+
+procedure Alpha(a : integer);
+var b : integer;
+begin
+    b := a * 2;
+    y := b + x
+end;
+
+begin
+    x := 3;
+    Alpha(x + 1);
+    z := y / 2
+end.
+'''
+
+
+@pytest.mark.parametrize('engine', core.ENGINES)
+def test_run_returns_the_global_variables(engine):
+    assert core.run(SOURCE, engine=engine) == {'X': 3, 'Y': 11, 'Z': 5.5}
+
+
+def test_run_checks_the_engine_before_compiling():
+    with pytest.raises(ValueError, match='Unknown engine'):
+        core.run('not a program', engine='jit')
+
+
+@pytest.mark.parametrize('engine', core.ENGINES)
+def test_run_traces_without_configuring_the_channels(capsys, engine):
+    tree = core.compile(SOURCE)
+
+    core.run(tree, engine=engine, trace=True)
+    assert 'ENTER: PROCEDURE ALPHA' in capsys.readouterr().out
+    assert not tracing.is_enabled(tracing.STACK)
+
+    with tracing.configured(stack=True):
+        core.run(tree, engine=engine)
+    assert capsys.readouterr().out == ''
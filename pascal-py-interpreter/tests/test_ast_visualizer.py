@@ -0,0 +1,62 @@
+import io
+import json
+
+import pytest
+
+from benchmarks.generator import generate_program
+from core.lexer import Lexer
+from core.parser import Parser
+from core.visitors.ast import ASTVisualizer
+
+SOURCE = generate_program(
+    var_decls=6, depth=3, expr_length=3, statements=8, calls=2, seed=1
+)
+
+
+# the expression of A is cut by max_depth 7, the same one in the main
+# block is not
+SHARED = '''
+program P; var x : integer;
+procedure A; begin x := (1 + 2) * (3 + 4) end;
+begin x := (1 + 2) * (3 + 4) end.
+'''
+
+
+def visualize(source=SOURCE, **options):
+    tree = Parser(Lexer(source)).parse()
+    out = io.StringIO()
+    ASTVisualizer(tree, format='json', **options).write(out)
+    return json.loads(out.getvalue())
+
+
+def nodes(node):
+    yield node
+    for child in node.get('children', ()):
+        yield from nodes(child)
+
+
+def is_cut(node):
+    return any(n.get('label', '').endswith('...') for n in nodes(node))
+
+
+@pytest.mark.parametrize('source, options', [
+    (SHARED, {'max_depth': 7}),
+    (SHARED, {'max_depth': 8, 'max_nodes': 24}),
+    (SOURCE, {'max_nodes': 40}),
+    (SOURCE, {'max_nodes': 150}),
+    (SOURCE, {'max_depth': 6, 'max_nodes': 100}),
+])
+def test_collapse_only_shares_subtrees_written_whole(source, options):
+    root = visualize(source, collapse=True, **options)
+    by_id = {node['id']: node for node in nodes(root) if 'id' in node}
+    refs = [node['ref'] for node in nodes(root) if 'ref' in node]
+    for ref in refs:
+        assert not is_cut(by_id[ref])
+
+
+def test_collapse_shares_identical_subtrees():
+    root = visualize(SHARED, collapse=True)
+    by_id = {node['id']: node for node in nodes(root) if 'id' in node}
+    refs = [node['ref'] for node in nodes(root) if 'ref' in node]
+    # the compound statement of the main block is the one of A
+    assert [by_id[ref]['label'] for ref in refs] == ['Compound']
@@ -0,0 +1,117 @@
+import pytest
+
+import main
+from core import batch
+
+PROGRAMS = {
+    'ok.pas': 'program P; var x : integer; begin x := 1 end.',
+    'lexer.pas': 'program P; begin x := 1 $ 2 end.',
+    'parser.pas': 'program P; begin x := end.',
+    'semantic.pas': 'program P; begin x := 1 end.',
+    'runtime.pas': 'program P; var x : integer; begin x := 1 div 0 end.',
+}
+
+STATUSES = {
+    'ok.pas': batch.OK,
+    'lexer.pas': batch.LEXER_ERROR,
+    'parser.pas': batch.PARSER_ERROR,
+    'semantic.pas': batch.SEMANTIC_ERROR,
+    'runtime.pas': batch.RUNTIME_ERROR,
+    'missing.pas': batch.READ_ERROR,
+}
+
+
+@pytest.fixture
+def programs(tmp_path):
+    for name, source in PROGRAMS.items():
+        (tmp_path / name).write_text(source)
+    return tmp_path
+
+
+def test_expand_keeps_paths_and_sorts_globs(tmp_path):
+    for name in ['b.pas', 'a.pas', 'sub/c.pas', 'notes.txt']:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).touch()
+
+    paths = batch.expand([
+        f'{tmp_path}/missing.pas', f'{tmp_path}/*.pas', f'{tmp_path}/**/c.*',
+    ])
+
+    assert paths == [
+        f'{tmp_path}/missing.pas',
+        f'{tmp_path}/a.pas',
+        f'{tmp_path}/b.pas',
+        f'{tmp_path}/sub/c.pas',
+    ]
+
+
+def test_expand_reads_the_manifest_after_the_patterns(tmp_path):
+    for name in ['a.pas', 'b.pas']:
+        (tmp_path / name).touch()
+    manifest = tmp_path / 'manifest'
+    manifest.write_text(
+        '# programs of the batch\n'
+        '\n'
+        f'  {tmp_path}/b.pas  \n'
+        f'#{tmp_path}/c.pas\n'
+        f'{tmp_path}/*.pas\n'
+    )
+
+    paths = batch.expand([f'{tmp_path}/x.pas'], str(manifest))
+
+    assert paths == [
+        f'{tmp_path}/x.pas', f'{tmp_path}/b.pas', f'{tmp_path}/a.pas',
+    ]
+
+
+@pytest.mark.parametrize('name, status', STATUSES.items())
+def test_run_file_reports_the_status(programs, name, status):
+    result = batch.run_file(str(programs / name))
+
+    assert result['status'] == status
+    assert bool(result['errors']) == (status != batch.OK)
+    assert 'total' in result['times']
+
+
+def test_run_file_reports_every_error(programs):
+    (programs / 'errors.pas').write_text(
+        'program P; begin x := 1; y := 2 end.'
+    )
+
+    result = batch.run_file(str(programs / 'errors.pas'), all_errors=True)
+
+    assert result['status'] == batch.SEMANTIC_ERROR
+    assert [error['line'] for error in result['errors']] == [1, 1]
+
+
+def test_a_pool_gives_the_results_of_a_single_job(programs):
+    paths = [str(programs / name) for name in STATUSES] * 3
+
+    def results(jobs):
+        return [
+            {key: value for key, value in result.items() if key != 'times'}
+            for result in batch.run_batch(paths, jobs)
+        ]
+
+    single = results(1)
+    assert [result['path'] for result in single] == paths
+    assert results(2) == single
+
+
+@pytest.mark.parametrize('option', [
+    ['inputfile.pas'],
+    ['--viz'],
+    ['--scope'],
+    ['--stack'],
+    ['--no-cache'],
+    ['--dump-py', 'out.py'],
+    ['--profile'],
+    ['--profile-phase', 'parser'],
+    ['--call-profile'],
+    ['--flamegraph', 'out.txt'],
+])
+def test_batch_rejects_the_options_of_a_single_run(capsys, option):
+    with pytest.raises(SystemExit):
+        main.parse_args([*option, '--batch', 'programs/*.pas'])
+
+    assert '--batch takes' in capsys.readouterr().err
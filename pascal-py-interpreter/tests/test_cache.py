@@ -0,0 +1,113 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+import core
+from core import cache
+
+SOURCE = '''
+program Main;
+var x : integer;
+begin
+    x := 3
+end.
+'''
+
+
+@pytest.fixture
+def program_path(tmp_path):
+    path = tmp_path / 'main.pas'
+    path.write_text(SOURCE)
+    return str(path)
+
+
+def entries(program_path):
+    directory = os.path.join(os.path.dirname(program_path), cache.CACHE_DIR)
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def test_a_stored_tree_is_loaded_back(program_path):
+    digest = cache.digest_source(SOURCE)
+    assert cache.load(program_path, digest) is None
+
+    cache.store(program_path, digest, core.compile(SOURCE))
+
+    tree = cache.load(program_path, digest)
+    assert tree is not None
+    assert core.run(tree) == {'X': 3}
+
+
+def test_a_second_run_hits_the_cache(tmp_path):
+    main = os.path.join(os.path.dirname(core.__path__[0]), 'main.py')
+    (tmp_path / 'programs').mkdir()
+    (tmp_path / 'programs' / 'main.pas').write_text(SOURCE)
+
+    def run():
+        return subprocess.run(
+            [sys.executable, main, 'main.pas'], cwd=tmp_path,
+            capture_output=True, text=True, check=True,
+        ).stdout
+
+    assert '(cached)' not in run()
+    assert '⓵  Lexer + ⓶  Parser + ⓷  Semantics (cached)' in run()
+    (tmp_path / 'programs' / 'main.pas').write_text(SOURCE.replace('3', '4'))
+    assert '(cached)' not in run()
+
+
+def test_the_source_is_hashed_the_same_from_text_or_file(program_path):
+    with open(program_path, 'rb') as f:
+        assert cache.digest_source(f) == cache.digest_source(SOURCE)
+
+
+def test_an_edited_source_misses_the_cache(program_path):
+    digest = cache.digest_source(SOURCE)
+    cache.store(program_path, digest, core.compile(SOURCE))
+
+    edited = SOURCE.replace('3', '4')
+    assert cache.load(program_path, cache.digest_source(edited)) is None
+
+
+@pytest.mark.parametrize('content', [b'', b'\x80\x05garbage', None])
+def test_a_corrupt_entry_is_only_a_miss(program_path, content):
+    digest = cache.digest_source(SOURCE)
+    cache.store(program_path, digest, core.compile(SOURCE))
+    path = cache.cache_path(program_path, digest)
+    if content is None:
+        # truncated halfway through the pickle
+        with open(path, 'rb') as f:
+            data = f.read()
+        content = data[:len(data) // 2]
+    with open(path, 'wb') as f:
+        f.write(content)
+
+    assert cache.load(program_path, digest) is None
+
+
+def test_an_entry_that_is_not_a_program_is_a_miss(program_path):
+    digest = cache.digest_source(SOURCE)
+    path = cache.cache_path(program_path, digest)
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        pickle.dump({'X': 3}, f)
+
+    assert cache.load(program_path, digest) is None
+
+
+def test_store_removes_the_stale_entries(program_path, tmp_path):
+    other_path = str(tmp_path / 'other.pas')
+    source_digest = cache.digest_source(SOURCE)
+    cache.store(other_path, source_digest, core.compile(SOURCE))
+    cache.store(program_path, source_digest, core.compile(SOURCE))
+
+    edited = SOURCE.replace('3', '4')
+    digest = cache.digest_source(edited)
+    cache.store(program_path, digest, core.compile(edited))
+
+    assert entries(program_path) == sorted([
+        os.path.basename(cache.cache_path(program_path, digest)),
+        os.path.basename(cache.cache_path(other_path, source_digest)),
+    ])
+    assert core.run(cache.load(program_path, digest)) == {'X': 4}
@@ -0,0 +1,81 @@
+import glob
+import os
+import random
+
+import pytest
+
+import core
+from benchmarks.generator import generate_program
+
+PROGRAMS = os.path.join(os.path.dirname(__file__), '..', 'programs')
+OTHER_ENGINES = [engine for engine in core.ENGINES if engine != 'tree']
+
+
+def sources():
+    """The sample programs, and generated ones with long expressions."""
+    params = []
+    for path in sorted(glob.glob(os.path.join(PROGRAMS, 'valid_*.pas'))):
+        with open(path) as file:
+            params.append(pytest.param(file.read(), id=os.path.basename(path)))
+    for seed in range(3):
+        params.append(pytest.param(
+            generate_program(
+                var_decls=10, depth=3, expr_length=12, statements=10,
+                calls=3, seed=seed
+            ),
+            id=f'generated-{seed}'
+        ))
+    return params
+
+
+def expression(rng, depth):
+    """A random expression of X and Y, with parentheses and signs."""
+    if depth == 0:
+        return rng.choice(['X', 'Y', str(rng.randint(1, 9))])
+    choice = rng.randrange(5)
+    if choice == 0:
+        return f'({expression(rng, depth - 1)})'
+    if choice == 1:
+        return f'-{expression(rng, depth - 1)}'
+    if choice == 2:
+        # divisors are constants, never zero
+        operator = rng.choice(['div', '/'])
+        return f'{expression(rng, depth - 1)} {operator} {rng.randint(1, 9)}'
+    operator = rng.choice(['+', '-', '*'])
+    return (
+        f'{expression(rng, depth - 1)} {operator} '
+        f'{expression(rng, depth - 1)}'
+    )
+
+
+def assert_engines_agree(source):
+    tree = core.compile(source)
+    expected = core.run(tree, engine='tree')
+    for engine in OTHER_ENGINES:
+        assert core.run(tree, engine=engine) == expected, engine
+
+
+@pytest.mark.parametrize('source', sources())
+def test_engines_agree(source):
+    assert_engines_agree(source)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_engines_agree_on_precedence(seed):
+    rng = random.Random(seed)
+    statements = [
+        f'Z := {expression(rng, 5)}' for _ in range(10)
+    ]
+    assert_engines_agree(
+        'program P; var X, Y : integer; Z : real;\n'
+        'begin X := 7; Y := -3;\n' + ';\n'.join(statements) + '\nend.'
+    )
+
+
+@pytest.mark.parametrize('operator', ['+', '-', '*'])
+def test_engines_run_long_expressions(operator):
+    # deeper than the 200 nested parentheses Python compiles
+    terms = f' {operator} '.join(['X'] * 300)
+    assert_engines_agree(
+        f'program P; var X, Y : integer; begin X := 1; Y := {terms} end.'
+    )
@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+from core.errors.lexer import LexerError
+from core.lexer import Lexer
+from core.token import TokenType
+
+SOURCE = '''program P; { a comment
+over { two lines }
+var   x : integer;
+begin {}x := 12 +    3.5 {
+} end.'''
+
+
+def tokens(lexer):
+    array = lexer.tokenize()
+    return [str(array.token(i)) for i in range(len(array))]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64])
+def test_streamed_input_splits_lexemes_across_chunks(chunk_size):
+    streamed = Lexer(io.StringIO(SOURCE), chunk_size=chunk_size)
+    assert tokens(streamed) == tokens(Lexer(SOURCE))
+
+
+def test_unclosed_comment_is_an_error():
+    source = 'program P;\nbegin end. { not closed\n\n'
+    lexer = Lexer(source)
+    with pytest.raises(LexerError) as error:
+        while lexer.get_next_token().type != TokenType.EOF:
+            pass
+    assert 'line: 2 column: 12' in error.value.message
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 64])
+def test_streamed_input_reports_an_unclosed_comment(chunk_size):
+    source = 'program P;\nbegin end. { not closed\n\n'
+    with pytest.raises(LexerError) as expected:
+        Lexer(source, regex=True).tokenize()
+    with pytest.raises(LexerError) as error:
+        Lexer(io.StringIO(source), chunk_size=chunk_size).tokenize()
+    assert error.value.message == expected.value.message
+    assert 'line: 2 column: 12' in error.value.message
+
+
+def test_streamed_comment_is_not_kept_in_the_buffer():
+    source = 'begin {' + 'x' * 10000 + '} end'
+    lexer = Lexer(io.StringIO(source), chunk_size=100)
+    assert tokens(lexer) == tokens(Lexer(source))
+    # the comment was dropped chunk by chunk, not read into one buffer
+    assert len(lexer._buf) <= 100
@@ -0,0 +1,32 @@
+import pytest
+
+import core
+from core.ast import Num
+from core.visitors.optimizer import ConstantFolder
+
+SOURCE = '''
+program P;
+var x, y : integer;
+    z : real;
+begin
+    x := 2 * (3 + 4) - -5;
+    y := x * 1 + 0 - 0;
+    z := -(7 / 2) + y div 3
+end.
+'''
+
+
+@pytest.mark.parametrize('engine', core.ENGINES)
+def test_folding_keeps_the_results(engine):
+    expected = core.run(SOURCE, engine=engine)
+    assert core.run(SOURCE, engine=engine, optimize=True) == expected
+
+
+def test_constant_expressions_become_numbers():
+    folder = ConstantFolder()
+    tree = folder.optimize(core.compile(SOURCE))
+    first, second, _ = tree.block.compound_statement.children
+    assert isinstance(first.right, Num) and first.right.value == 19
+    # identities are dropped, the variable is kept
+    assert second.right.value == 'X'
+    assert folder.stats['folded'] and folder.stats['simplified']
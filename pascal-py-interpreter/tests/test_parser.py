@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from core.ast import FunctionDecl, Program, Type
+from core.errors.parser import ParserError
+from core.lexer import Lexer
+from core.parser import Parser
+from core.token import TokenType
+from core.visitors.semantic import SemanticAnalyzer
+
+
+def parse(source):
+    parser = Parser(Lexer(source), recover=True)
+    return parser.parse(), parser.errors
+
+
+def test_function_without_return_type_gets_a_placeholder():
+    tree, errors = parse(
+        'program P; var x : integer;\n'
+        'function F(a : integer); begin F := a end;\n'
+        'begin x := 1 end.'
+    )
+    assert [error.token.type for error in errors] == [TokenType.SEMI]
+
+    function = tree.block.declarations[-1]
+    assert isinstance(function, FunctionDecl)
+    assert isinstance(function.return_type, Type)
+    assert function.return_type.value == 'INTEGER'
+    assert SemanticAnalyzer(recover=True).analyze(tree) == []
+
+
+def test_errors_on_the_same_token_are_reported_once():
+    # the missing END and DOT are both reported at the EOF token
+    _, errors = parse('program P; begin x := 1')
+    assert len(errors) == 1
+
+
+INCOMPLETE = [
+    'program',
+    'program P; var',
+    'program P; var x, ',
+    'program P; procedure Q(',
+    'program P; begin x := y + ',
+    'program P; var x :',
+    'program P; procedure Q(a :',
+    'program P; function F : ',
+    'program P; var x : ; begin end.',
+]
+
+# a program with every construct, for the fuzz test
+SOURCE = '''program P; var x, y : integer; z : real;
+procedure A(a, b : integer; c : real); var d : integer;
+begin d := a end;
+function F(a : integer) : real; begin F := a / 2 end;
+begin x := (1 + 2) * -y div 3; A(x, y, z); begin z := 1.5 end end.'''
+
+
+@pytest.mark.parametrize('source', INCOMPLETE)
+def test_incomplete_program_is_a_syntax_error(source):
+    with pytest.raises(ParserError):
+        Parser(Lexer(source)).parse()
+
+
+@pytest.mark.parametrize('source', INCOMPLETE + [''])
+def test_recovery_reports_incomplete_programs(source):
+    tree, errors = parse(source)
+    assert isinstance(tree, Program)
+    assert errors
+
+
+def test_recovery_survives_broken_programs():
+    tokens = SOURCE.replace('(', ' ( ').replace(')', ' ) ').split()
+    rng = random.Random(0)
+    for _ in range(500):
+        broken = list(tokens)
+        if rng.randrange(2):
+            # cut anywhere, down to nothing
+            del broken[rng.randrange(len(broken) + 1):]
+        else:
+            for _ in range(rng.randint(1, 3)):
+                del broken[rng.randrange(len(broken))]
+        tree, _ = parse(' '.join(broken))
+        assert isinstance(tree, Program)
+
+
+@pytest.mark.parametrize('tokenize', [False, True])
+def test_peek_looks_ahead_of_the_current_token(tokenize):
+    lexer = Lexer('program P; begin end.')
+    parser = Parser(lexer.tokenize() if tokenize else lexer)
+
+    assert parser.peek().type == TokenType.ID
+    assert parser.peek_type(2) == TokenType.SEMI
+    assert parser.peek_type(100) == TokenType.EOF
+    for n in [0, -1]:
+        with pytest.raises(ValueError):
+            parser.peek(n)
+        with pytest.raises(ValueError):
+            parser.peek_type(n)
+    assert parser.current_type == TokenType.PROGRAM
@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+import core
+from core.lexer import Lexer
+from core.parser import Parser
+from core.visitors.source_to_source import Source2Source
+
+SOURCE = '''
+program Main;
+var x, y : real;
+    n : integer;
+
+procedure Alpha(a : integer; b : real);
+var x : integer;
+
+   procedure Beta(c : integer);
+   var y : integer;
+   begin
+      y := a + c + x;
+      n := y
+   end;
+
+begin
+   x := a * 2;
+   y := b
+end;
+
+procedure Gamma();
+begin
+   n := n + 1
+end;
+
+begin
+   n := 1;
+   y := x
+end.
+'''
+
+EXPECTED = '''\
+program MAIN0;
+  var X1 : REAL;
+  var Y1 : REAL;
+  var N1 : INTEGER;
+  procedure ALPHA1(A : INTEGER,B : REAL);
+    var X2 : INTEGER;
+    procedure BETA2(C : INTEGER);
+      var Y3 : INTEGER;
+
+    begin
+        <Y3:INTEGER> := <A2:INTEGER> + <C3:INTEGER> + <X2:INTEGER>;
+        <N1:INTEGER> := <Y3:INTEGER>;
+    end; {END OF BETA}
+
+  begin
+      <X2:INTEGER> := <A2:INTEGER> * 2;
+      <Y1:REAL> := <B2:REAL>;
+  end; {END OF ALPHA}
+  procedure GAMMA1();
+
+  begin
+      <N1:INTEGER> := <N1:INTEGER> + 1;
+
+  end; {END OF GAMMA}
+
+begin
+    <N1:INTEGER> := 1;
+    <Y1:REAL> := <X1:REAL>;
+end. {END OF MAIN}'''
+
+
+def test_names_are_tagged_with_their_scope_level():
+    assert Source2Source().translate(core.compile(SOURCE)) == EXPECTED
+
+
+def test_the_source_is_streamed_to_a_file():
+    out = io.StringIO()
+    Source2Source(out).translate(core.compile(SOURCE))
+    assert out.getvalue() == EXPECTED
+
+
+def test_an_unanalyzed_tree_is_rejected():
+    tree = Parser(Lexer(SOURCE)).parse()
+    with pytest.raises(ValueError, match='analyzed by the SemanticAnalyzer'):
+        Source2Source().translate(tree)
@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+from core import tracing
+from core.ast import AST
+from core.lexer import Lexer
+from core.parser import Parser
+from core.symbol import (
+    BuiltinTypeSymbol, FlatSymbolTable, ScopedSymbolTable, VarSymbol
+)
+from core.visitors.semantic import SemanticAnalyzer
+
+# few names, so they are often shadowed, redefined or missing
+NAMES = 'ABCD'
+TYPES = ['integer', 'real']
+
+
+def random_block(rng, procedures, depth):
+    lines = []
+    for _ in range(rng.randint(0, 3)):
+        lines.append(f'var {rng.choice(NAMES)} : {rng.choice(TYPES)};')
+    for _ in range(rng.randint(0, 2) if depth < 3 else 0):
+        # a procedure may reuse a variable's or another procedure's name
+        name = rng.choice(procedures + list(NAMES) + ['P'])
+        name = f'{name}{rng.randrange(3)}' if name == 'P' else name
+        params = '; '.join(
+            f'{rng.choice(NAMES)} : {rng.choice(TYPES)}'
+            for _ in range(rng.randint(0, 2))
+        )
+        procedures.append(name)
+        lines.append(f'procedure {name}({params});')
+        lines.append(random_block(rng, procedures, depth + 1) + ';')
+
+    statements = []
+    for _ in range(rng.randint(1, 3)):
+        if procedures and rng.randrange(3) == 0:
+            args = ', '.join(
+                rng.choice(NAMES) for _ in range(rng.randint(1, 2))
+            )
+            statements.append(f'{rng.choice(procedures)}({args})')
+        else:
+            left, *right = (rng.choice(NAMES) for _ in range(3))
+            statements.append(f'{left} := {" + ".join(right)}')
+    lines.append('begin ' + '; '.join(statements) + ' end')
+    return '\n'.join(lines)
+
+
+def random_program(rng):
+    return f'program Main;\n{random_block(rng, [], 0)}.'
+
+
+def resolutions(node):
+    """What the analysis left on the tree: slots, depths and symbols."""
+    found = []
+    if isinstance(node, list):
+        for child in node:
+            found.extend(resolutions(child))
+        return found
+    if not isinstance(node, AST):
+        return found
+    for attr in ['depth', 'slot', 'slot_names']:
+        if hasattr(node, attr):
+            found.append((type(node).__name__, attr, getattr(node, attr)))
+    if getattr(node, 'proc_symbol', None) is not None:
+        found.append(('ProcedureCall', 'proc_symbol', str(node.proc_symbol)))
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if not name.startswith('_') and hasattr(node, name):
+                found.extend(resolutions(getattr(node, name)))
+    return found
+
+
+def analyze(source, symbol_table, capsys):
+    tree = Parser(Lexer(source)).parse()
+    analyzer = SemanticAnalyzer(symbol_table=symbol_table, recover=True)
+    with tracing.configured(scope=True):
+        errors = analyzer.analyze(tree)
+    # the lists of parameters are logged by address
+    trace = [
+        line for line in capsys.readouterr().out.splitlines()
+        if ' object at 0x' not in line
+    ]
+    return [error.message for error in errors], resolutions(tree), trace
+
+
+def test_flat_table_analyzes_like_the_scoped_table(capsys):
+    rng = random.Random(0)
+    for _ in range(1000):
+        source = random_program(rng)
+        flat = analyze(source, FlatSymbolTable, capsys)
+        scoped = analyze(source, ScopedSymbolTable, capsys)
+        assert flat == scoped, source
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_flat_table_looks_up_like_the_scoped_table(seed):
+    # scopes are created, used and looked up in any order, closed or not
+    rng = random.Random(seed)
+    tables = {}
+    for symbol_table in (ScopedSymbolTable, FlatSymbolTable):
+        rng.seed(seed)
+        scopes = [symbol_table(1, 'global')]
+        results = []
+        for _ in range(500):
+            scope = rng.choice(scopes)
+            action = rng.randrange(4)
+            if action == 0 and scope.scope_level < 5:
+                scopes.append(symbol_table(
+                    scope.scope_level + 1, f'S{len(scopes)}', scope
+                ))
+            elif action == 1:
+                name = rng.choice(NAMES)
+                scope.define(VarSymbol(name, BuiltinTypeSymbol('INTEGER')))
+            else:
+                name = rng.choice(NAMES + 'X')
+                found = scope.lookup(
+                    name,
+                    current_scope_only=rng.randrange(4) == 0,
+                    with_scope=True,
+                )
+                symbol, level = found or (None, None)
+                results.append((
+                    scope.scope_name, name, level,
+                    symbol and scope.lookup(name) is symbol,
+                    getattr(symbol, 'slot', None),
+                ))
+        tables[symbol_table] = results
+    assert tables[FlatSymbolTable] == tables[ScopedSymbolTable]
@@ -0,0 +1,77 @@
+import glob
+import os
+
+import pytest
+
+import core
+from benchmarks.generator import generate_program
+from core import tracing
+from core.visitors.pascal import Interpreter
+from core.vm import Compiler, VirtualMachine
+
+PROGRAMS = os.path.join(os.path.dirname(__file__), '..', 'programs')
+
+
+def sources():
+    """The sample programs, and a few generated ones with nested calls."""
+    params = []
+    for path in sorted(glob.glob(os.path.join(PROGRAMS, 'valid_*.pas'))):
+        with open(path) as file:
+            params.append(pytest.param(file.read(), id=os.path.basename(path)))
+    for seed in range(3):
+        params.append(pytest.param(
+            generate_program(
+                var_decls=10, depth=3, statements=5, calls=3, seed=seed
+            ),
+            id=f'generated-{seed}'
+        ))
+    return params
+
+
+def stack_trace(capsys, run):
+    """The stack trace printed by `run`, without the engine prefixes."""
+    capsys.readouterr()
+    with tracing.configured(stack=True):
+        run()
+    return [
+        line.split('| ', 1)[-1]
+        for line in capsys.readouterr().out.splitlines()
+    ]
+
+
+@pytest.mark.parametrize('source', sources())
+def test_vm_traces_like_the_interpreter(capsys, source):
+    tree = core.compile(source)
+    program = Compiler().compile(tree)
+
+    expected = stack_trace(capsys, lambda: Interpreter(tree).interpret())
+    vm_run = lambda: VirtualMachine(program).run()
+    assert stack_trace(capsys, vm_run) == expected
+    # a compiled program runs any number of times
+    assert stack_trace(capsys, vm_run) == expected
+
+
+def test_vm_reports_unassigned_variables():
+    tree = core.compile('program P; var x, y : integer; begin y := x end.')
+    with pytest.raises(NameError, match="'X'"):
+        VirtualMachine(Compiler().compile(tree)).run()
+
+
+def test_compiler_folds_locals_and_constants_into_operators():
+    tree = core.compile(
+        'program P; var x : integer; y : real;'
+        ' begin y := x / 2.0 + x; y := 1 - x * y end.'
+    )
+    code = Compiler().compile(tree).main.disassemble().splitlines()
+    assert [line.split(None, 1)[1] for line in code[1:]] == [
+        'LOAD_LOCAL   0',
+        'BINARY_CONST FLOAT_DIV 0',
+        'BINARY_LOCAL ADD 0',
+        'STORE_LOCAL  1',
+        'PUSH_CONST   1',
+        'LOAD_LOCAL   0',
+        'BINARY_LOCAL MUL 1',
+        'BINARY       SUB',
+        'STORE_LOCAL  1',
+        'RETURN',
+    ]